@@ -30,3 +30,27 @@ class UserRoles(enum.Enum):
     admin = 'admin' # can do everything
     researcher = 'researcher' # almost everything, is the main user
     employee = 'employee' # just create patient and register fingerprints and other data less revelant
+
+class ImageTypeEnum(str, enum.Enum):
+    raw = "raw"
+    filtered = "filtered"
+
+class FingerprintImageEnum(str, enum.Enum):
+    raw = "raw"
+    filtered = "filtered"
+    processed = "processed"
+    normalized = "normalized"
+
+class JobStatus(enum.Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class ExportFormatEnum(str, enum.Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+class ArchiveFormatEnum(str, enum.Enum):
+    zip = "zip"
+    tar = "tar"
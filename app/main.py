@@ -1,10 +1,17 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routers import user, fingerprint, auth, volunteer, project, image_detection
+from app.routers import user, fingerprint, auth, volunteer, project, image_detection, metrics
+from app.utils.compute_pool import shutdown_compute_executor
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
-app = FastAPI(title="TCC Dermatóglifo API", version="1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    shutdown_compute_executor()
+
+app = FastAPI(title="TCC Dermatóglifo API", version="1.0", lifespan=lifespan)
 
 app.add_middleware(SessionMiddleware, secret_key=os.getenv("SESSION_SECRET", "supersecret"))
 
@@ -19,7 +26,7 @@ app.add_middleware(
     allow_credentials=True,               
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],  
     allow_headers=["*"],                 
-    expose_headers=["*"]
+    expose_headers=["*", "X-Next-Cursor"]
 )
 
 app.include_router(image_detection.router, prefix="/fingerprint", tags=["fingerprint"])
@@ -28,5 +35,6 @@ app.include_router(user.router)
 app.include_router(project.router)
 app.include_router(volunteer.router)
 app.include_router(fingerprint.router)
+app.include_router(metrics.router)
 # app.include_router(review.router)
 
@@ -4,4 +4,6 @@ from .fingerprint import Fingerprint
 from .volunteer import Volunteer
 from .review import Review
 from .project import Project
-from .user_project import UserProject
\ No newline at end of file
+from .user_project import UserProject
+from .detection import SingularPointDetection, OrientationField
+from .processing_job import ProcessingJob
\ No newline at end of file
@@ -0,0 +1,50 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, LargeBinary, UniqueConstraint
+from datetime import datetime
+from sqlalchemy.orm import relationship
+from .base import Base
+
+class SingularPointDetection(Base):
+    __tablename__ = "singular_point_detections"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint_id = Column(Integer, ForeignKey("fingerprints.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Hash sha256 do conteúdo da imagem usada + parâmetros da detecção
+    image_hash = Column(String(64), nullable=False)
+    params_key = Column(String, nullable=False)
+
+    deltas = Column(JSON, nullable=False)
+    cores = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('image_hash', 'params_key', name='uq_detection_image_params'),
+    )
+
+    fingerprint = relationship("Fingerprint", back_populates="detections")
+
+
+class OrientationField(Base):
+    __tablename__ = "orientation_fields"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint_id = Column(Integer, ForeignKey("fingerprints.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Os campos dependem só da imagem e da grade de blocos
+    image_hash = Column(String(64), nullable=False)
+    block_size = Column(Integer, nullable=False)
+    stride = Column(Integer, nullable=False)
+
+    # Matrizes em formato .npy (float16/float32)
+    orientation = Column(LargeBinary, nullable=False)
+    coherence = Column(LargeBinary, nullable=False)
+    poincare = Column(LargeBinary, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('image_hash', 'block_size', 'stride', name='uq_field_image_grid'),
+    )
+
+    fingerprint = relationship("Fingerprint", back_populates="orientation_fields")
@@ -1,8 +1,73 @@
-from sqlalchemy import Column, Integer, ForeignKey, Enum, LargeBinary, DateTime, Text
+from sqlalchemy import Column, Integer, ForeignKey, Enum, LargeBinary, DateTime, Text, String, Index, Float
 from datetime import datetime
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from .base import Base
 from app.constants.enum import HandEnum, FingerEnum, PatternEnum
+from app.utils.image_store import get_image_store, describe_image
+
+
+def stored_image_values(name: str, data) -> dict:
+    """
+    Grava `data` no armazenamento e devolve os valores das colunas
+    `<name>_*` da imagem. Usado pelo descritor e pelos INSERTs em lote, que
+    não passam pelos atributos do ORM.
+    """
+    if data is None:
+        image_hash, size, (fmt, width, height) = None, None, (None, None, None)
+    else:
+        image_hash = get_image_store().put(data)
+        size = len(data)
+        fmt, width, height = describe_image(data)
+
+    return {
+        f"{name}_hash": image_hash,
+        f"{name}_size": size,
+        f"{name}_format": fmt,
+        f"{name}_width": width,
+        f"{name}_height": height,
+    }
+
+
+class StoredImage:
+    """
+    Imagem da digital guardada no armazenamento de imagens (app.utils.image_store).
+
+    A tabela só guarda hash, tamanho, formato e dimensões (colunas `<nome>_*`).
+    Digitais ainda não migradas (migrate-images.py) continuam com os bytes na
+    coluna antiga `<nome>_legacy`, lida apenas quando o hash não está no
+    armazenamento. Imagens criadas depois do armazenamento não têm coluna
+    antiga (`legacy=False`).
+    """
+
+    def __init__(self, legacy: bool = True):
+        self.legacy = legacy
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        image_hash = getattr(obj, f"{self.name}_hash")
+        if image_hash is not None:
+            data = get_image_store().get(image_hash)
+            if data is not None:
+                return data
+        return getattr(obj, f"{self.name}_legacy") if self.legacy else None
+
+    def __set__(self, obj, data):
+        self.assign(obj, stored_image_values(self.name, data))
+
+    def assign(self, obj, values: dict) -> None:
+        """
+        Atribui os valores de stored_image_values (imagem já gravada). Rotas
+        assíncronas gravam no armazenamento numa thread e só atribuem aqui.
+        """
+        for key, value in values.items():
+            setattr(obj, key, value)
+        if self.legacy:
+            setattr(obj, f"{self.name}_legacy", None)
+
 
 class Fingerprint(Base):
     __tablename__ = "fingerprints"
@@ -15,13 +80,122 @@ class Fingerprint(Base):
     pattern_type = Column(Enum(PatternEnum))
 
     delta = Column(Integer)
-    image_data = Column(LargeBinary)
-    image_filtered = Column(LargeBinary)
-    image_processed = Column(LargeBinary)
+    image_data = StoredImage()
+    image_filtered = StoredImage()
+    image_processed = StoredImage()
+    # Recorte reamostrado de image_data (app.utils.ingest), usado no processamento
+    image_normalized = StoredImage(legacy=False)
+
+    # Bytes das digitais gravadas antes do armazenamento de imagens; nunca
+    # carregados junto com a linha
+    image_data_legacy = deferred(Column("image_data", LargeBinary))
+    image_filtered_legacy = deferred(Column("image_filtered", LargeBinary))
+    image_processed_legacy = deferred(Column("image_processed", LargeBinary))
+
+    # sha256 das imagens: endereço no armazenamento e chave do cache de detecção
+    image_data_hash = Column(String(64))
+    image_filtered_hash = Column(String(64))
+    image_processed_hash = Column(String(64))
+    image_normalized_hash = Column(String(64))
+
+    image_data_size = Column(Integer)
+    image_data_format = Column(String(16))
+    image_data_width = Column(Integer)
+    image_data_height = Column(Integer)
+    image_filtered_size = Column(Integer)
+    image_filtered_format = Column(String(16))
+    image_filtered_width = Column(Integer)
+    image_filtered_height = Column(Integer)
+    image_processed_size = Column(Integer)
+    image_processed_format = Column(String(16))
+    image_processed_width = Column(Integer)
+    image_processed_height = Column(Integer)
+    image_normalized_size = Column(Integer)
+    image_normalized_format = Column(String(16))
+    image_normalized_width = Column(Integer)
+    image_normalized_height = Column(Integer)
+
+    # Transformação de image_data para image_normalized: recorte em pixels da
+    # original e escala (px normalizados por px original). Pontos detectados
+    # na imagem normalizada voltam para a original com x / escala + crop_x
+    ingest_crop_x = Column(Integer)
+    ingest_crop_y = Column(Integer)
+    ingest_crop_width = Column(Integer)
+    ingest_crop_height = Column(Integer)
+    ingest_scale = Column(Float)
+
+    # Backend de realce (app.utils.process_images) que gerou image_filtered;
+    # vazio quando a imagem filtrada veio pronta do cliente ou de um pacote
+    image_filtered_backend = Column(String(32))
+    image_filtered_backend_version = Column(String(32))
 
     number_of_lines = Column(Integer)
     notes = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    volunteer = relationship("Volunteer", back_populates="fingerprints")
\ No newline at end of file
+    # Paginação por (created_at, id) e filtros das listagens
+    __table_args__ = (
+        Index("ix_fingerprints_created_at_id", "created_at", "id"),
+        Index("ix_fingerprints_volunteer_created_at_id", "volunteer_id", "created_at", "id"),
+        Index("ix_fingerprints_hand_finger_created_at_id", "hand", "finger", "created_at", "id"),
+    )
+
+    volunteer = relationship("Volunteer", back_populates="fingerprints")
+    detections = relationship(
+        "SingularPointDetection",
+        back_populates="fingerprint",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    orientation_fields = relationship(
+        "OrientationField",
+        back_populates="fingerprint",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    jobs = relationship(
+        "ProcessingJob",
+        back_populates="fingerprint",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+
+# Transformação da ingestão (app.utils.ingest)
+INGEST_COLUMNS = (
+    Fingerprint.ingest_crop_x,
+    Fingerprint.ingest_crop_y,
+    Fingerprint.ingest_crop_width,
+    Fingerprint.ingest_crop_height,
+    Fingerprint.ingest_scale,
+)
+
+# Colunas de metadados (sem imagens), para listagens com load_only
+FINGERPRINT_METADATA_COLUMNS = (
+    Fingerprint.id,
+    Fingerprint.volunteer_id,
+    Fingerprint.hand,
+    Fingerprint.finger,
+    Fingerprint.pattern_type,
+    Fingerprint.delta,
+    Fingerprint.notes,
+    Fingerprint.number_of_lines,
+    Fingerprint.created_at,
+    Fingerprint.image_filtered_backend,
+    Fingerprint.image_filtered_backend_version,
+    *INGEST_COLUMNS,
+)
+
+FINGERPRINT_IMAGE_HASH_COLUMNS = (
+    Fingerprint.image_data_hash,
+    Fingerprint.image_filtered_hash,
+    Fingerprint.image_processed_hash,
+    Fingerprint.image_normalized_hash,
+)
+
+FINGERPRINT_LEGACY_IMAGE_COLUMNS = (
+    Fingerprint.image_data_legacy,
+    Fingerprint.image_filtered_legacy,
+    Fingerprint.image_processed_legacy,
+)
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Enum, Index
+from datetime import datetime
+from sqlalchemy.orm import relationship
+from .base import Base
+from app.constants.enum import JobStatus
+
+class ProcessingJob(Base):
+    __tablename__ = "processing_jobs"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint_id = Column(Integer, ForeignKey("fingerprints.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String, nullable=False, default="enhance")
+    # Backend de realce escolhido no upload/importação
+    backend = Column(String(32))
+
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    last_error = Column(Text)
+
+    # Próxima tentativa (backoff) e trava do worker que está executando
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = Column(String)
+    locked_at = Column(DateTime)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_processing_jobs_status_run_after", "status", "run_after"),
+    )
+
+    fingerprint = relationship("Fingerprint", back_populates="jobs")
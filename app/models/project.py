@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from .base import Base
@@ -9,10 +9,16 @@ class Project(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
+    # Backend de realce das digitais do projeto; vazio usa ENHANCEMENT_BACKEND
+    enhancement_backend = Column(String(32), nullable=True)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_projects_created_at_id", "created_at", "id"),
+    )
+
     volunteers = relationship("Volunteer", back_populates="project")
     users = relationship("UserProject", back_populates="project")
     users = relationship(
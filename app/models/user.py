@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy import Enum
 from datetime import datetime
 from sqlalchemy.orm import relationship
@@ -13,8 +13,12 @@ class User(Base):
     email = Column(String, unique=True, nullable=False)
     role = Column(Enum(UserRoles), nullable=False, default=UserRoles.researcher)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
     projects = relationship("UserProject", back_populates="user")
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Text, Float, Enum
+from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Text, Float, Enum, Index
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from .base import Base
@@ -21,6 +21,13 @@ class Volunteer(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    # Paginação por (created_at, id) e filtros das listagens
+    __table_args__ = (
+        Index("ix_volunteers_created_at_id", "created_at", "id"),
+        Index("ix_volunteers_project_created_at_id", "project_id", "created_at", "id"),
+        Index("ix_volunteers_status_created_at_id", "status", "created_at", "id"),
+    )
+
     fingerprints = relationship("Fingerprint", back_populates="volunteer")
     project = relationship("Project", back_populates="volunteers")
 
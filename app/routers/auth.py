@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from authlib.integrations.starlette_client import OAuth
 from datetime import datetime
 from fastapi.responses import RedirectResponse
 from app.schemas.user import UserOut
 from app.models.user import User
-from app.db import get_db
+from app.db import get_async_db
 import jwt
 import os
 
@@ -27,7 +29,7 @@ async def google_login(request: Request):
     return await oauth.google.authorize_redirect(request, redirect_uri)
 
 @router.get("/google/callback", response_model=UserOut)
-async def google_callback(request: Request, db: Session = Depends(get_db)):
+async def google_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
         token = await oauth.google.authorize_access_token(request)
         user_info = token.get("userinfo")
@@ -35,7 +37,10 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
         if not user_info:
             raise HTTPException(status_code=400, detail="Google login failed")
 
-        user = db.query(User).filter(User.email == user_info["email"]).first()
+        user = await db.scalar(
+            select(User).options(selectinload(User.projects)).where(User.email == user_info["email"])
+        )
+        has_projects = user is not None and len(user.projects) > 0
 
         if not user:
             user = User(
@@ -45,19 +50,15 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
                 updated_at=datetime.now(),
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
 
         payload = {"user_id": user.id, "email": user.email}
         jwt_token = jwt.encode(payload, os.getenv("JWT_SECRET"), algorithm=os.getenv("JWT_ALGORITHM"))
 
-        if user:
-            has_projects = len(user.projects) > 0
-
-            if has_projects:
-                redirect_url = f"http://localhost:8080/home?token={jwt_token}&user_id={user.id}"
-            else:
-                redirect_url = f"http://localhost:8080/create-project?token={jwt_token}&user_id={user.id}"
+        if has_projects:
+            redirect_url = f"http://localhost:8080/home?token={jwt_token}&user_id={user.id}"
+        else:
+            redirect_url = f"http://localhost:8080/create-project?token={jwt_token}&user_id={user.id}"
 
         return RedirectResponse(url=redirect_url)
 
@@ -1,42 +1,171 @@
-from fastapi import APIRouter, Path, Depends, HTTPException, Form, File, UploadFile
-from sqlalchemy.orm import Session
-from app.schemas.fingerprint import FingerprintCreate, FingerprintOut
+from fastapi import APIRouter, Path, Query, Depends, HTTPException, Form, File, UploadFile, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session, load_only, undefer
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.fingerprint import (
+    FingerprintCreate, FingerprintOut, ProcessingJobOut, serialize_fingerprint, serialize_fingerprint_metadata,
+)
 from datetime import datetime
+from typing import Optional
 from app.models.volunteer import Volunteer
-from app.models.fingerprint import Fingerprint
-from app.constants.enum import FingerEnum, HandEnum, PatternEnum
-from app.db import get_db
-from app.utils.process_images import process
+from app.models.project import Project
+from app.models.fingerprint import (
+    Fingerprint, stored_image_values, FINGERPRINT_METADATA_COLUMNS, FINGERPRINT_IMAGE_HASH_COLUMNS, FINGERPRINT_LEGACY_IMAGE_COLUMNS,
+    INGEST_COLUMNS,
+)
+from app.constants.enum import FingerEnum, HandEnum, PatternEnum, JobStatus, FingerprintImageEnum
+from app.db import get_db, get_async_db, AsyncSessionLocal
+from app.utils.process_images import check_backend_name, get_default_backend_name
+from app.utils.ingest import ingest_image, apply_ingest_transform
+from app.utils.image_format import compact_image, get_storage_format
+from app.utils.compute_pool import get_compute_executor
 from app.utils.to_base_64 import to_base64
+from app.utils.detection_cache import invalidate_fingerprint_detections
+from app.utils.field_cache import invalidate_fingerprint_fields
+from app.utils.job_queue import enqueue_job, get_latest_job
+from app.utils.image_hash import sha256_hex
+from app.utils.image_store import get_image_store, image_media_type, describe_image
+from app.utils.image_response import image_response
+from app.utils.pagination import paginate, filter_created_at, MAX_PAGE_SIZE
+from app.utils.serialization import fast_response
+import asyncio
 import base64
+import json
+import os
+
+# Com "false" o realce volta a ser feito durante o upload, sem worker
+ENHANCE_IN_BACKGROUND = os.getenv("ENHANCE_IN_BACKGROUND", "true").lower() == "true"
+
+# Intervalo de consulta e duração máxima do stream de status
+PROCESSING_POLL_SECONDS = 1.0
+PROCESSING_STREAM_TIMEOUT = 300
+
+FINGERPRINT_IMAGES = {
+    FingerprintImageEnum.raw: "image_data",
+    FingerprintImageEnum.filtered: "image_filtered",
+    FingerprintImageEnum.processed: "image_processed",
+    FingerprintImageEnum.normalized: "image_normalized",
+}
 
 router = APIRouter(prefix="/fingerprints", tags=["Fingerprints"])
 
+# Colunas antigas das imagens (diferidas no modelo) na mesma consulta: com a
+# sessão assíncrona não há carregamento tardio ao ler os bytes
+with_legacy_images = [undefer(column) for column in FINGERPRINT_LEGACY_IMAGE_COLUMNS]
+
+async def get_fingerprint_or_404(db: AsyncSession, fingerprint_id: int, *options) -> Fingerprint:
+    fingerprint = await db.scalar(
+        select(Fingerprint).options(*options).where(Fingerprint.id == fingerprint_id)
+    )
+    if not fingerprint:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Fingerprint com ID {fingerprint_id} não encontrado"
+        )
+    return fingerprint
+
+async def store_images(fingerprint: Fingerprint, **images) -> None:
+    """
+    Grava as imagens (`image_data=bytes`, ...) no armazenamento numa thread,
+    já que o put faz fsync, e só atribui as colunas na digital: pelo
+    descritor StoredImage a escrita bloquearia o event loop.
+    """
+    values = await run_in_threadpool(
+        lambda: {name: stored_image_values(name, data) for name, data in images.items()}
+    )
+    for name, image_values in values.items():
+        getattr(Fingerprint, name).assign(fingerprint, image_values)
+
+async def read_images(fingerprint: Fingerprint, *names: str) -> tuple:
+    """
+    Lê as imagens do armazenamento numa thread. As colunas antigas precisam
+    estar carregadas (with_legacy_images).
+    """
+    return await run_in_threadpool(lambda: tuple(getattr(fingerprint, name) for name in names))
+
+def get_image_urls(request: Request, fingerprint: Fingerprint) -> dict:
+    """URLs de GET /fingerprints/{id}/images/{imagem} para as imagens que a digital tem."""
+    return {
+        f"{name}_url": str(request.url_for(
+            "get_fingerprint_image", fingerprint_id=fingerprint.id, image=image.value
+        )) if getattr(fingerprint, f"{name}_hash") is not None else None
+        for image, name in FINGERPRINT_IMAGES.items()
+    }
+
+def get_metadata(fingerprint: Fingerprint) -> dict:
+    return {
+        "id": fingerprint.id,
+        "volunteer_id": fingerprint.volunteer_id,
+        "hand": fingerprint.hand,
+        "finger": fingerprint.finger,
+        "pattern_type": fingerprint.pattern_type,
+        "delta": fingerprint.delta,
+        "notes": fingerprint.notes,
+        "number_of_lines": fingerprint.number_of_lines,
+        "created_at": fingerprint.created_at,
+        "image_filtered_backend": fingerprint.image_filtered_backend,
+        "image_filtered_backend_version": fingerprint.image_filtered_backend_version,
+        **{column.key: getattr(fingerprint, column.key) for column in INGEST_COLUMNS},
+    }
+
 @router.get("/", response_model=list[FingerprintOut])
-def list_fingerprints(db: Session = Depends(get_db)):
+async def list_fingerprints(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página; sem limite devolve todos"),
+    created_from: Optional[datetime] = Query(None, description="Criados a partir de"),
+    created_to: Optional[datetime] = Query(None, description="Criados antes de"),
+    volunteer_id: Optional[int] = Query(None),
+    project_id: Optional[int] = Query(None),
+    hand: Optional[HandEnum] = Query(None),
+    finger: Optional[FingerEnum] = Query(None),
+    pattern_type: Optional[PatternEnum] = Query(None),
+    include_images: bool = Query(True, description="Inclui as imagens em base64; com false só os metadados"),
+    image_urls: bool = Query(False, description="Devolve URLs das imagens em vez do base64"),
+    db: AsyncSession = Depends(get_async_db),
+):
     
     try:
-        fingerprints = db.query(Fingerprint).order_by(Fingerprint.created_at.desc()).all()
-        mapped_fingerprints = [
-            {
-                "id": fp.id,
-                "volunteer_id": fp.volunteer_id,
-                "hand": fp.hand,
-                "finger": fp.finger,
-                "pattern_type": fp.pattern_type,
-                "delta": fp.delta,
-                "notes": fp.notes,
-                "number_of_lines": fp.number_of_lines,
-                "image_data": to_base64(fp.image_data),
-                "image_filtered": to_base64(fp.image_filtered),
-                "image_processed": to_base64(fp.image_processed),
-                "created_at": fp.created_at,
-            }
-            for fp in fingerprints
-        ]
+        # Só os metadados e os hashes; os bytes são lidos apenas se pedidos
+        columns = [*FINGERPRINT_METADATA_COLUMNS, *FINGERPRINT_IMAGE_HASH_COLUMNS]
+        if include_images and not image_urls:
+            # Colunas antigas na mesma consulta, em vez de uma por digital não migrada
+            columns += FINGERPRINT_LEGACY_IMAGE_COLUMNS
+        stmt = select(Fingerprint).options(load_only(*columns))
+        if project_id is not None:
+            stmt = stmt.join(Volunteer, Fingerprint.volunteer_id == Volunteer.id).where(
+                Volunteer.project_id == project_id
+            )
+        if volunteer_id is not None:
+            stmt = stmt.where(Fingerprint.volunteer_id == volunteer_id)
+        if hand is not None:
+            stmt = stmt.where(Fingerprint.hand == hand)
+        if finger is not None:
+            stmt = stmt.where(Fingerprint.finger == finger)
+        if pattern_type is not None:
+            stmt = stmt.where(Fingerprint.pattern_type == pattern_type)
+        stmt = filter_created_at(stmt, Fingerprint, created_from, created_to)
+
+        fingerprints = await paginate(db, stmt, Fingerprint, response, cursor, limit)
+        if image_urls:
+            content = [
+                {**serialize_fingerprint_metadata(fp), **get_image_urls(request, fp)}
+                for fp in fingerprints
+            ]
+        elif include_images:
+            # As imagens são lidas do armazenamento: fora do event loop
+            content = await run_in_threadpool(lambda: [serialize_fingerprint(fp) for fp in fingerprints])
+        else:
+            content = [serialize_fingerprint_metadata(fp) for fp in fingerprints]
         
-        return mapped_fingerprints
+        # Linhas do banco: serializadas direto, sem validar cada item no FingerprintOut
+        return fast_response(content, response)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -44,23 +173,75 @@ def list_fingerprints(db: Session = Depends(get_db)):
         )
     
 @router.get("/{fingerprint_id}", response_model=FingerprintOut)
-def get_volunteer(
+async def get_volunteer(
+    request: Request,
+    fingerprint_id: int = Path(..., description="ID da digital"),
+    include_images: bool = Query(True, description="Inclui as imagens em base64; com false só os metadados"),
+    image_urls: bool = Query(False, description="Devolve URLs das imagens em vez do base64"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    options = with_legacy_images if include_images and not image_urls else []
+    fingerprint = await get_fingerprint_or_404(db, fingerprint_id, *options)
+    
+    if image_urls:
+        return FingerprintOut(**get_metadata(fingerprint), **get_image_urls(request, fingerprint))
+    if not include_images:
+        return FingerprintOut(**get_metadata(fingerprint))
+
+    # As imagens são lidas do armazenamento: fora do event loop
+    return await run_in_threadpool(lambda: FingerprintOut.model_validate(fingerprint, from_attributes=True))
+
+@router.get("/{fingerprint_id}/images/{image}", name="get_fingerprint_image")
+def get_fingerprint_image(
+    request: Request,
     fingerprint_id: int = Path(..., description="ID da digital"),
+    image: FingerprintImageEnum = Path(..., description="Imagem: raw, filtered, processed ou normalized"),
     db: Session = Depends(get_db),
 ):
+    """
+    Bytes da imagem com o content-type do formato gravado. A ETag é o sha256
+    do conteúdo: com If-None-Match igual responde 304 sem ler a imagem.
+    Aceita Range (um intervalo) e If-Range.
+    """
     fingerprint = (
         db.query(Fingerprint)
         .filter(Fingerprint.id == fingerprint_id)
         .first()
     )
-    
     if not fingerprint:
         raise HTTPException(
-            status_code=404, 
+            status_code=404,
             detail=f"Fingerprint com ID {fingerprint_id} não encontrado"
         )
-    
-    return fingerprint
+
+    name = FINGERPRINT_IMAGES[image]
+    image_hash = getattr(fingerprint, f"{name}_hash")
+    media_type = image_media_type(getattr(fingerprint, f"{name}_format"))
+
+    buffer = get_image_store().open(image_hash) if image_hash is not None else None
+    if buffer is None:
+        # Digital ainda não migrada: bytes na coluna antiga, para as imagens que têm uma
+        buffer = getattr(fingerprint, f"{name}_legacy") if getattr(Fingerprint, name).legacy else None
+        if buffer is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"A fingerprint não possui imagem {image.value}"
+            )
+        if image_hash is None:
+            image_hash = sha256_hex(buffer)
+            setattr(fingerprint, f"{name}_hash", image_hash)
+            db.commit()
+        media_type = image_media_type(describe_image(buffer)[0])
+
+    return image_response(request, buffer, image_hash, media_type)
+
+async def resolve_backend(db: AsyncSession, project_id: Optional[int], requested: Optional[str] = None) -> str:
+    """Backend de realce: pedido > projeto do voluntário > ENHANCEMENT_BACKEND."""
+    return (
+        requested
+        or await db.scalar(select(Project.enhancement_backend).where(Project.id == project_id))
+        or get_default_backend_name()
+    )
 
 @router.post("/", response_model=FingerprintOut)
 async def create_fingerprint(
@@ -72,14 +253,21 @@ async def create_fingerprint(
     number_of_lines: int = Form(None),
     notes: str = Form(None),
     image_data: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    enhancement_backend: Optional[str] = Form(None, description="Backend de realce; sem valor usa o do projeto"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    volunteer = db.query(Volunteer).filter(Volunteer.id == volunteer_id).first()
+    volunteer = await db.get(Volunteer, volunteer_id)
     if not volunteer:
         raise HTTPException(status_code=404, detail="Volunteer not found")
 
+    backend = await resolve_backend(db, volunteer.project_id, check_backend_name(enhancement_backend))
+
     image_bytes = await image_data.read()
-    image_filtered = process(image_bytes)
+    # Recorte e reamostragem da digital (app.utils.ingest) sempre no upload;
+    # o realce fica para o worker (enhancement-worker.py) em segundo plano
+    normalized, enhanced = await get_compute_executor().run(
+        ingest_image, image_bytes, backend, not ENHANCE_IN_BACKGROUND
+    )
 
     new_fp = Fingerprint(
         volunteer_id=volunteer_id,
@@ -89,13 +277,24 @@ async def create_fingerprint(
         delta=delta,
         notes=notes,
         number_of_lines=number_of_lines,
-        image_data=image_bytes,
-        image_filtered=image_filtered,
+        image_filtered_backend=enhanced.backend if enhanced else None,
+        image_filtered_backend_version=enhanced.version if enhanced else None,
         created_at=datetime.now()
     )
+    await store_images(
+        new_fp,
+        image_data=image_bytes,
+        image_filtered=enhanced.image if enhanced else None,
+        image_normalized=normalized.image if normalized else None,
+    )
+    apply_ingest_transform(new_fp, normalized.transform if normalized else None)
     db.add(new_fp)
-    db.commit()
-    db.refresh(new_fp)
+    processing_status = None
+    if enhanced is None:
+        await db.flush()
+        await db.run_sync(enqueue_job, new_fp.id, backend=backend)
+        processing_status = JobStatus.pending
+    await db.commit()
 
     return FingerprintOut(
         id=new_fp.id,
@@ -106,11 +305,76 @@ async def create_fingerprint(
         delta=new_fp.delta,
         notes=new_fp.notes,
         number_of_lines=number_of_lines,
-        image_data=to_base64(new_fp.image_data),
-        image_filtered=to_base64(new_fp.image_filtered),
+        image_data=to_base64(image_bytes),
+        image_filtered=to_base64(enhanced.image if enhanced else None),
+        processing_status=processing_status,
+        image_filtered_backend=new_fp.image_filtered_backend,
+        image_filtered_backend_version=new_fp.image_filtered_backend_version,
+        **{column.key: getattr(new_fp, column.key) for column in INGEST_COLUMNS},
         created_at=new_fp.created_at
     )
 
+def get_processing_job(db: Session, fingerprint_id: int):
+    job = get_latest_job(db, fingerprint_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Nenhum processamento registrado para a digital {fingerprint_id}"
+        )
+    return job
+
+@router.get("/{fingerprint_id}/processing", response_model=ProcessingJobOut)
+async def get_processing_status(
+    fingerprint_id: int = Path(..., description="ID da digital"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Estado do realce em segundo plano da digital."""
+    return await db.run_sync(get_processing_job, fingerprint_id)
+
+@router.get("/{fingerprint_id}/processing/events")
+async def stream_processing_status(
+    fingerprint_id: int = Path(..., description="ID da digital"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Server-Sent Events com o estado do realce: envia um evento a cada mudança
+    e encerra quando o job termina (done/failed).
+    """
+    await db.run_sync(get_processing_job, fingerprint_id)
+
+    async def read_status():
+        # Sessão própria: a da requisição é fechada antes do fim do stream
+        async with AsyncSessionLocal() as session:
+            job = await session.run_sync(get_latest_job, fingerprint_id)
+            return ProcessingJobOut.model_validate(job).model_dump(mode="json")
+
+    async def events():
+        last = None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + PROCESSING_STREAM_TIMEOUT
+        while loop.time() < deadline:
+            current = await read_status()
+            if current != last:
+                yield f"data: {json.dumps(current)}\n\n"
+                last = current
+            if current["status"] in (JobStatus.done.value, JobStatus.failed.value):
+                return
+            await asyncio.sleep(PROCESSING_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+async def compact_upload(data: bytes, name: str) -> bytes:
+    """
+    Imagem derivada enviada pelo cliente, regravada sem perdas no formato de
+    armazenamento de `name` quando fica menor; senão, como veio.
+    """
+    compacted = await get_compute_executor().run(compact_image, data, get_storage_format(name))
+    return compacted if compacted is not None else data
+
 @router.put("/{fingerprint_id}", response_model=FingerprintOut)
 async def update_fingerprint(
     fingerprint_id: int = Path(...),
@@ -124,18 +388,9 @@ async def update_fingerprint(
     image_data: str | None = Form(None),
     image_filtered: str | None = Form(None),
     image_processed: UploadFile | None = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    existing_fingerprint = (
-        db.query(Fingerprint)
-        .filter(Fingerprint.id == fingerprint_id)
-        .first()
-    )
-    if not existing_fingerprint:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Fingerprint com ID {fingerprint_id} não encontrado",
-        )
+    existing_fingerprint = await get_fingerprint_or_404(db, fingerprint_id, *with_legacy_images)
 
     # Atualiza apenas os campos fornecidos
     existing_fingerprint.volunteer_id = volunteer_id
@@ -147,17 +402,52 @@ async def update_fingerprint(
     existing_fingerprint.number_of_lines = number_of_lines
     existing_fingerprint.updated_at = datetime.now()
 
+    processing_status = None
     if image_data is not None:
-        existing_fingerprint.image_data = base64.b64decode(image_data)
+        image_bytes = base64.b64decode(image_data)
+        # Sem uma filtrada nova junto, a atual é o realce da imagem antiga:
+        # realça de novo, como no upload
+        enhance = image_filtered is None
+        backend = None
+        if enhance:
+            project_id = await db.scalar(select(Volunteer.project_id).where(Volunteer.id == volunteer_id))
+            backend = await resolve_backend(db, project_id)
+        normalized, enhanced = await get_compute_executor().run(
+            ingest_image, image_bytes, backend, enhance and not ENHANCE_IN_BACKGROUND
+        )
+        images = {"image_data": image_bytes, "image_normalized": normalized.image if normalized else None}
+        if enhance:
+            images["image_filtered"] = enhanced.image if enhanced else None
+        await store_images(existing_fingerprint, **images)
+        apply_ingest_transform(existing_fingerprint, normalized.transform if normalized else None)
+        if enhance:
+            existing_fingerprint.image_filtered_backend = enhanced.backend if enhanced else None
+            existing_fingerprint.image_filtered_backend_version = enhanced.version if enhanced else None
+            if enhanced is None:
+                await db.run_sync(enqueue_job, existing_fingerprint.id, backend=backend)
+                processing_status = JobStatus.pending
     
     if image_filtered is not None:
-        existing_fingerprint.image_filtered = base64.b64decode(image_filtered)
+        await store_images(
+            existing_fingerprint,
+            image_filtered=await compact_upload(base64.b64decode(image_filtered), "image_filtered"),
+        )
+        # Imagem filtrada enviada pronta: não veio de um backend de realce
+        existing_fingerprint.image_filtered_backend = None
+        existing_fingerprint.image_filtered_backend_version = None
+    
+    if image_data is not None or image_filtered is not None:
+        await db.run_sync(invalidate_fingerprint_detections, existing_fingerprint)
+        await db.run_sync(invalidate_fingerprint_fields, existing_fingerprint)
 
     if image_processed is not None:
-        existing_fingerprint.image_processed = await image_processed.read()
+        await store_images(
+            existing_fingerprint,
+            image_processed=await compact_upload(await image_processed.read(), "image_processed"),
+        )
 
-    db.commit()
-    db.refresh(existing_fingerprint)
+    await db.commit()
+    current_data, current_filtered = await read_images(existing_fingerprint, "image_data", "image_filtered")
 
     # Retorna o schema de saída
     return FingerprintOut(
@@ -169,8 +459,12 @@ async def update_fingerprint(
         delta=existing_fingerprint.delta,
         notes=existing_fingerprint.notes,
         number_of_lines=existing_fingerprint.number_of_lines,
-        image_data=existing_fingerprint.image_data,
-        image_filtered=existing_fingerprint.image_filtered,
+        image_data=current_data,
+        image_filtered=current_filtered,
+        processing_status=processing_status,
+        image_filtered_backend=existing_fingerprint.image_filtered_backend,
+        image_filtered_backend_version=existing_fingerprint.image_filtered_backend_version,
+        **{column.key: getattr(existing_fingerprint, column.key) for column in INGEST_COLUMNS},
         created_at=existing_fingerprint.created_at,
         updated_at=existing_fingerprint.updated_at,
     )
@@ -1,21 +1,31 @@
-import base64
-import io
-import cv2
-import numpy as np
-from scipy import ndimage
+import json
 from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from typing import List
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from app.models.fingerprint import Fingerprint
-from sqlalchemy.orm import Session
-from enum import Enum
-from app.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_async_db, SessionLocal
+from app.constants.enum import ImageTypeEnum
+from app.utils.fingerprint_detector import (
+    SimpleFingerprintDetector, SingularPointParams,
+    detect_image, compute_image_fields, sweep_fields,
+)
+from app.utils.detection_cache import (
+    get_cached_detection, store_detection, make_params_key,
+    get_fingerprint_image_hash, load_image_handle, image_columns, NORMALIZED_COLUMNS,
+)
+from app.utils.ingest import get_ingest_transform
+from app.schemas.fingerprint import IngestTransformOut
+from app.utils.field_cache import get_cached_fields, store_fields
+from app.utils.image_handle import ImageHandle
+from app.utils.batch_detection import select_fingerprint_ids, run_batch_detection
+from app.utils.compute_pool import get_compute_executor, get_pool_size
 
 router = APIRouter()
 
-class ImageTypeEnum(str, Enum):
-    raw = "raw"
-    filtered = "filtered"
+# Blocos (e passos da grade) maiores que isso não cabem numa digital
+MAX_BLOCK_SIZE = 128
 
 class DetectionPoint(BaseModel):
     x: int
@@ -26,296 +36,176 @@ class DetectionResult(BaseModel):
     cores: List[DetectionPoint]
     image_width: int = 700
     image_height: int = 700
+    transform: Optional[IngestTransformOut] = None
 
 
 class DetectionRequest(BaseModel):
     fingerprint_id: int
     image_type: ImageTypeEnum
-    block_size: int = 16
+    block_size: int = Field(16, gt=0, le=MAX_BLOCK_SIZE)
     min_coherence: float = 0.5
+    stride: Optional[int] = Field(None, gt=0, le=MAX_BLOCK_SIZE)
+    params: SingularPointParams = SingularPointParams()
+    pyramid: bool = False
 
 
-class SimpleFingerprintDetector:
-    def __init__(self, image_array):
-        self.image = image_array
-        if self.image is None or self.image.size == 0:
-            raise ValueError("Imagem inválida")
-        
-        self.height, self.width = self.image.shape
-    
-    def compute_gradients(self):
-        self.gx = cv2.Sobel(self.image, cv2.CV_64F, 1, 0, ksize=3)
-        self.gy = cv2.Sobel(self.image, cv2.CV_64F, 0, 1, ksize=3)
-    
-    def compute_orientation_field(self, block_size=16):
-        h, w = self.image.shape
-        blocks_h = h // block_size
-        blocks_w = w // block_size
-        
-        orientation = np.zeros((blocks_h, blocks_w))
-        coherence = np.zeros((blocks_h, blocks_w))
-        
-        for i in range(blocks_h):
-            for j in range(blocks_w):
-                y_start = i * block_size
-                x_start = j * block_size
-                y_end = y_start + block_size
-                x_end = x_start + block_size
-                
-                gx_block = self.gx[y_start:y_end, x_start:x_end]
-                gy_block = self.gy[y_start:y_end, x_start:x_end]
-                
-                Gxx = np.sum(gx_block * gx_block)
-                Gyy = np.sum(gy_block * gy_block)
-                Gxy = np.sum(gx_block * gy_block)
-                
-                orientation[i, j] = 0.5 * np.arctan2(2 * Gxy, Gxx - Gyy)
-                coherence[i, j] = np.sqrt((Gxx - Gyy)**2 + 4*Gxy**2) / (Gxx + Gyy + 1e-10)
-        
-        return orientation, coherence, block_size
-    
-    def smooth_orientation(self, orientation, sigma=1.5):
-        sin_ori = np.sin(2 * orientation)
-        cos_ori = np.cos(2 * orientation)
-        
-        sin_smooth = ndimage.gaussian_filter(sin_ori, sigma)
-        cos_smooth = ndimage.gaussian_filter(cos_ori, sigma)
-        
-        orientation_smooth = 0.5 * np.arctan2(sin_smooth, cos_smooth)
-        return orientation_smooth
-    
-    def compute_poincare_index(self, orientation, coherence, min_coherence=0.5):
-        h, w = orientation.shape
-        poincare = np.zeros((h, w))
-        
-        for i in range(1, h - 1):
-            for j in range(1, w - 1):
-                if coherence[i, j] < min_coherence:
-                    continue
-                
-                neighbors = [
-                    orientation[i-1, j],
-                    orientation[i-1, j+1],
-                    orientation[i, j+1],
-                    orientation[i+1, j+1],
-                    orientation[i+1, j],
-                    orientation[i+1, j-1],
-                    orientation[i, j-1],
-                    orientation[i-1, j-1]
-                ]
-                
-                angle_sum = 0
-                for k in range(8):
-                    diff = neighbors[(k+1) % 8] - neighbors[k]
-                    
-                    while diff > np.pi/2:
-                        diff -= np.pi
-                    while diff < -np.pi/2:
-                        diff += np.pi
-                    
-                    angle_sum += diff
-                
-                poincare[i, j] = angle_sum / (2 * np.pi)
-        
-        return poincare
-    
-    def refine_position(self, poincare, i, j, search_type='delta', radius=2):
-        h, w = poincare.shape
-        
-        i_min = max(0, i - radius)
-        i_max = min(h, i + radius + 1)
-        j_min = max(0, j - radius)
-        j_max = min(w, j + radius + 1)
-        
-        region = poincare[i_min:i_max, j_min:j_max]
-        
-        if search_type == 'delta':
-            local_min_idx = np.unravel_index(np.argmin(region), region.shape)
-            refined_i = i_min + local_min_idx[0]
-            refined_j = j_min + local_min_idx[1]
-        else:
-            local_max_idx = np.unravel_index(np.argmax(region), region.shape)
-            refined_i = i_min + local_max_idx[0]
-            refined_j = j_min + local_max_idx[1]
-        
-        return refined_i, refined_j
-    
-    def find_singular_points(self, poincare, coherence, block_size):
-        h, w = poincare.shape
-        
-        deltas = []
-        cores = []
-        
-        DELTA_MIN, DELTA_MAX = -0.55, -0.45
-        CORE_MIN, CORE_MAX = 0.45, 0.55
-        MIN_COHERENCE_DELTA = 0.65
-        MIN_COHERENCE_CORE = 0.75
-        MARGIN = 4
-        LOCAL_THRESHOLD = 0.98
-        
-        for i in range(MARGIN, h - MARGIN):
-            for j in range(MARGIN, w - MARGIN):
-                pi_value = poincare[i, j]
-                coh_value = coherence[i, j]
-                
-                if DELTA_MIN < pi_value < DELTA_MAX:
-                    if coh_value < MIN_COHERENCE_DELTA:
-                        continue
-                    
-                    local_region = np.abs(poincare[i-2:i+3, j-2:j+3])
-                    if np.abs(pi_value) >= np.max(local_region) * LOCAL_THRESHOLD:
-                        local_coherence = coherence[i-2:i+3, j-2:j+3]
-                        avg_coherence = np.mean(local_coherence)
-                        
-                        if avg_coherence >= 0.55:
-                            refined_i, refined_j = self.refine_position(
-                                poincare, i, j, search_type='delta'
-                            )
-                            
-                            y = refined_i * block_size + block_size // 2
-                            x = refined_j * block_size + block_size // 2
-                            deltas.append({
-                                'x': int(x), 
-                                'y': int(y),
-                                'index': float(pi_value),
-                                'coherence': float(coh_value),
-                                'avg_coherence': float(avg_coherence)
-                            })
-                
-                elif CORE_MIN < pi_value < CORE_MAX:
-                    if coh_value < MIN_COHERENCE_CORE:
-                        continue
-                    
-                    local_region = poincare[i-2:i+3, j-2:j+3]
-                    if pi_value >= np.max(local_region) * LOCAL_THRESHOLD:
-                        local_coherence = coherence[i-2:i+3, j-2:j+3]
-                        avg_coherence = np.mean(local_coherence)
-                        
-                        if avg_coherence >= 0.70:
-                            high_coherence_count = np.sum(local_coherence > 0.65)
-                            
-                            if high_coherence_count >= 15:
-                                refined_i, refined_j = self.refine_position(
-                                    poincare, i, j, search_type='core'
-                                )
-                                
-                                y = refined_i * block_size + block_size // 2
-                                x = refined_j * block_size + block_size // 2
-                                cores.append({
-                                    'x': int(x), 
-                                    'y': int(y),
-                                    'index': float(pi_value),
-                                    'coherence': float(coh_value),
-                                    'avg_coherence': float(avg_coherence)
-                                })
-        
-        return deltas, cores
-    
-    def remove_duplicates(self, points, min_distance=50):
-        if len(points) == 0:
-            return []
-        
-        if points and 'index' in points[0] and 'coherence' in points[0]:
-            points_sorted = sorted(points, 
-                                  key=lambda p: abs(p['index']) * p['coherence'], 
-                                  reverse=True)
-        elif points and 'coherence' in points[0]:
-            points_sorted = sorted(points, 
-                                  key=lambda p: p['coherence'], 
-                                  reverse=True)
-        else:
-            points_sorted = points
-        
-        filtered = []
-        for point in points_sorted:
-            is_duplicate = False
-            for existing in filtered:
-                dist = np.sqrt((point['x'] - existing['x'])**2 + 
-                              (point['y'] - existing['y'])**2)
-                if dist < min_distance:
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
-                filtered.append(point)
-        
-        return filtered
-    
-    def detect(self, block_size=16, min_coherence=0.5):
-        self.compute_gradients()
-        orientation, coherence, bs = self.compute_orientation_field(block_size)
-        orientation = self.smooth_orientation(orientation)
-        poincare = self.compute_poincare_index(orientation, coherence, min_coherence)
-        deltas, cores = self.find_singular_points(poincare, coherence, bs)
-        deltas = self.remove_duplicates(deltas, min_distance=50)
-        cores = self.remove_duplicates(cores, min_distance=50)
-        
-        return deltas, cores
+class SweepRequest(BaseModel):
+    fingerprint_id: int
+    image_type: ImageTypeEnum
+    block_size: int = Field(16, gt=0, le=MAX_BLOCK_SIZE)
+    stride: Optional[int] = Field(None, gt=0, le=MAX_BLOCK_SIZE)
+    min_coherence: List[float] = [0.5]
+    params: List[SingularPointParams] = [SingularPointParams()]
 
 
-def decode_binary_image(image_bytes: bytes) -> np.ndarray:
-    """Decodifica bytes de imagem para array numpy (escala de cinza)."""
-    try:
-        # Converte bytes para array numpy
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        
-        # Decodifica a imagem
-        image = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if image is None:
-            raise ValueError("Falha ao decodificar a imagem")
-        
-        return image
+class SweepItem(BaseModel):
+    min_coherence: float
+    params: SingularPointParams
+    deltas: List[DetectionPoint]
+    cores: List[DetectionPoint]
+
+
+class SweepResult(BaseModel):
+    results: List[SweepItem]
+    image_width: int = 700
+    image_height: int = 700
+    transform: Optional[IngestTransformOut] = None
+
+
+MAX_SWEEP_SIZE = 500
+
+
+class BatchDetectionRequest(BaseModel):
+    project_id: Optional[int] = None
+    volunteer_id: Optional[int] = None
+    fingerprint_ids: Optional[List[int]] = None
+    image_type: ImageTypeEnum
+    block_size: int = Field(16, gt=0, le=MAX_BLOCK_SIZE)
+    min_coherence: float = 0.5
+    stride: Optional[int] = Field(None, gt=0, le=MAX_BLOCK_SIZE)
+    params: SingularPointParams = SingularPointParams()
+    pyramid: bool = False
+    update_delta: bool = False
+
+
+def detection_frame(fingerprint: Fingerprint, image_type: ImageTypeEnum) -> dict:
+    """
+    Dimensões da imagem em que os pontos foram detectados e, quando ela é a
+    normalizada na ingestão (ou a filtrada gerada dela, do mesmo tamanho), a
+    transformação que leva os pontos de volta para a imagem original.
+    Digitais sem dimensões gravadas ficam com o padrão 700x700.
+    """
+    column, _ = image_columns(fingerprint, image_type)
+    frame = {}
+    width = getattr(fingerprint, f"{column}_width")
+    height = getattr(fingerprint, f"{column}_height")
+    if width is not None and height is not None:
+        frame.update(image_width=width, image_height=height)
+
+    normalized, _ = NORMALIZED_COLUMNS
+    transform = get_ingest_transform(fingerprint)
+    same_frame = column == normalized or (
+        (width, height) == (fingerprint.image_normalized_width, fingerprint.image_normalized_height)
+    )
+    if transform is not None and same_frame:
+        frame["transform"] = IngestTransformOut(
+            crop_x=transform.x, crop_y=transform.y,
+            crop_width=transform.width, crop_height=transform.height,
+            scale=transform.scale,
+        )
+    return frame
+
+
+async def read_image_handle(db: AsyncSession, fingerprint: Fingerprint, image_type: ImageTypeEnum,
+                            image_hash: str, image_bytes: Optional[bytes]) -> ImageHandle:
+    """load_image_handle dentro da sessão: digitais não migradas leem a coluna antiga sob demanda."""
+    return await db.run_sync(lambda _: load_image_handle(fingerprint, image_type, image_hash, image_bytes))
+
+
+async def get_or_compute_fields(db: AsyncSession, fingerprint: Fingerprint, image_type: ImageTypeEnum,
+                                image_hash: str, image_bytes: Optional[bytes],
+                                block_size: int, stride: Optional[int]):
+    """
+    Devolve os campos intermediários da imagem, calculando e gravando quando
+    ainda não existem. Os campos recém-calculados passam pelos mesmos tipos
+    compactos da gravação, para o resultado não depender do cache.
+    """
+    fields = await db.run_sync(get_cached_fields, image_hash, block_size, stride)
+    if fields is not None:
+        return fields
     
-    except Exception as e:
-        raise ValueError(f"Erro ao processar imagem: {str(e)}")
+    image = await read_image_handle(db, fingerprint, image_type, image_hash, image_bytes)
+    
+    fields = await get_compute_executor().run(
+        compute_image_fields, image, block_size, stride
+    )
+    await db.run_sync(store_fields, fingerprint.id, image_hash, block_size, stride, fields)
+    
+    return fields
 
 
 @router.post("/detect-singular-points", response_model=DetectionResult)
 async def detect_singular_points(
     request: DetectionRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        fingerprint = db.query(Fingerprint).filter(
-            Fingerprint.id == request.fingerprint_id
-        ).first()
+        fingerprint, image_hash, image_bytes = await db.run_sync(
+            get_fingerprint_image_hash, request.fingerprint_id, request.image_type
+        )
         
-        if not fingerprint:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Fingerprint com ID {request.fingerprint_id} não encontrada"
-            )
+        params_key = make_params_key(
+            request.block_size, request.min_coherence, request.stride,
+            request.params, request.pyramid
+        )
+        cached = await db.run_sync(get_cached_detection, image_hash, params_key)
+        
+        fields = None
+        if cached is None and not request.pyramid:
+            fields = await db.run_sync(get_cached_fields, image_hash, request.block_size, request.stride)
         
-        if request.image_type == ImageTypeEnum.raw:
-            image_bytes = fingerprint.image_data
-            if not image_bytes:
-                raise HTTPException(
-                    status_code=400,
-                    detail="A fingerprint não possui imagem raw (image_data)"
+        if cached is not None:
+            deltas, cores = cached
+        elif fields is None:
+            # Detecção completa num processo do pool; os campos calculados
+            # também vão para o cache
+            image = await read_image_handle(db, fingerprint, request.image_type, image_hash, image_bytes)
+            
+            deltas, cores, fields = await get_compute_executor().run(
+                detect_image,
+                image,
+                request.block_size,
+                request.min_coherence,
+                request.stride,
+                request.params,
+                request.pyramid,
+            )
+            
+            if fields is not None:
+                await db.run_sync(
+                    store_fields, fingerprint.id, image_hash, request.block_size, request.stride, fields
                 )
+            await db.run_sync(store_detection, fingerprint.id, image_hash, params_key, deltas, cores)
         else:
-            image_bytes = fingerprint.image_filtered
-            if not image_bytes:
-                raise HTTPException(
-                    status_code=400,
-                    detail="A fingerprint não possui imagem filtered (image_filtered)"
-                )
-        
-        image = decode_binary_image(image_bytes)
-        detector = SimpleFingerprintDetector(image)
-        
-        deltas, cores = detector.detect(
-            block_size=request.block_size,
-            min_coherence=request.min_coherence
-        )
+            # Orientação, coerência e Poincaré não dependem dos limiares
+            _, coherence, poincare = fields
+            deltas, cores = SimpleFingerprintDetector.detect_from_fields(
+                poincare, coherence,
+                block_size=request.block_size,
+                min_coherence=request.min_coherence,
+                stride=request.stride,
+                params=request.params
+            )
+            
+            await db.run_sync(store_detection, fingerprint.id, image_hash, params_key, deltas, cores)
         
         delta_points = [DetectionPoint(x=d['x'], y=d['y']) for d in deltas]
         core_points = [DetectionPoint(x=c['x'], y=c['y']) for c in cores]
         
         return DetectionResult(
             deltas=delta_points,
-            cores=core_points
+            cores=core_points,
+            **detection_frame(fingerprint, request.image_type)
         )
     
     except HTTPException:
@@ -326,4 +216,103 @@ async def detect_singular_points(
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao processar detecção: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/detect-singular-points/sweep", response_model=SweepResult)
+async def sweep_singular_points(
+    request: SweepRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Avalia uma grade de limiares (min_coherence x params) sobre os mesmos
+    campos intermediários, calculados uma única vez por imagem e block_size.
+    """
+    sweep_size = len(request.min_coherence) * len(request.params)
+    if sweep_size == 0 or sweep_size > MAX_SWEEP_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A varredura deve ter entre 1 e {MAX_SWEEP_SIZE} combinações"
+        )
+    
+    try:
+        fingerprint, image_hash, image_bytes = await db.run_sync(
+            get_fingerprint_image_hash, request.fingerprint_id, request.image_type
+        )
+        _, coherence, poincare = await get_or_compute_fields(
+            db, fingerprint, request.image_type, image_hash, image_bytes,
+            request.block_size, request.stride
+        )
+        
+        sweep = await get_compute_executor().run(
+            sweep_fields,
+            poincare,
+            coherence,
+            request.block_size,
+            request.stride,
+            request.min_coherence,
+            request.params,
+        )
+        
+        results = [
+            SweepItem(
+                min_coherence=min_coherence,
+                params=params,
+                deltas=[DetectionPoint(x=d['x'], y=d['y']) for d in deltas],
+                cores=[DetectionPoint(x=c['x'], y=c['y']) for c in cores],
+            )
+            for min_coherence, params, deltas, cores in sweep
+        ]
+        
+        return SweepResult(results=results, **detection_frame(fingerprint, request.image_type))
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao processar detecção: {str(e)}"
+        )
+
+
+@router.post("/detect-singular-points/batch")
+def detect_singular_points_batch(request: BatchDetectionRequest):
+    """
+    Detecta os pontos singulares de um projeto, voluntário ou lista de digitais
+    em paralelo, devolvendo uma linha NDJSON por digital assim que termina.
+    Com `update_delta`, grava a quantidade de deltas encontrada em Fingerprint.delta.
+    """
+    if request.project_id is None and request.volunteer_id is None and request.fingerprint_ids is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Informe project_id, volunteer_id ou fingerprint_ids"
+        )
+    
+    def generate():
+        # A sessão da requisição já foi fechada quando a resposta é transmitida
+        db = SessionLocal()
+        try:
+            fingerprint_ids = select_fingerprint_ids(
+                db, request.project_id, request.volunteer_id, request.fingerprint_ids
+            )
+            results = run_batch_detection(
+                db,
+                fingerprint_ids,
+                get_compute_executor(),
+                image_type=request.image_type,
+                block_size=request.block_size,
+                min_coherence=request.min_coherence,
+                stride=request.stride,
+                params=request.params,
+                pyramid=request.pyramid,
+                update_delta=request.update_delta,
+                max_in_flight=2 * get_pool_size(),
+            )
+            for item in results:
+                yield json.dumps(item) + "\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from app.db import engine, async_engine
+from app.utils.compute_pool import get_compute_executor
+from app.utils.db_pool import pool_stats
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/compute")
+def compute_metrics():
+    """Ocupação do pool de processamento de imagens: workers ocupados e tamanho da fila."""
+    return get_compute_executor().stats()
+
+@router.get("/db")
+def database_metrics():
+    """
+    Pools de conexões com o banco: `sync` (worker, exportações, rotas `def`) e
+    `async` (rotas `async def`). Cada processo do servidor tem os seus, então
+    o total no Postgres é workers x (pool_size + max_overflow) por engine.
+    """
+    return {
+        "sync": pool_stats(engine),
+        "async": pool_stats(async_engine.sync_engine),
+    }
@@ -1,22 +1,40 @@
-from fastapi import APIRouter, Path, Depends, HTTPException, Form
+from fastapi import APIRouter, Path, Query, Depends, HTTPException, Form, File, UploadFile, Response
+from fastapi.responses import StreamingResponse
 from typing import Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.schemas.project import ProjectCreate, ProjectOut
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.project import ProjectCreate, ProjectOut, serialize_project
 from datetime import datetime
 from app.models.user_project import UserProject
 from app.models.project import Project
-from app.db import get_db
+from app.db import get_db, get_async_db, SessionLocal
+from app.constants.enum import ExportFormatEnum, ArchiveFormatEnum
+from app.schemas.archive import ArchiveImportResult
+from app.utils.pagination import paginate, filter_created_at, MAX_PAGE_SIZE
+from app.utils.serialization import fast_response
+from app.utils.project_export import export_ndjson, export_csv
+from app.utils.project_archive import import_project_archive, export_project_archive
+from app.utils.process_images import check_backend_name, get_default_backend_name
 
 router = APIRouter(prefix="/projects", tags=["Project"])
 
 @router.get("/", response_model=list[ProjectOut])
-def list_projects(db: Session = Depends(get_db)):
-    projects = db.query(Project).all()
-    return projects
+async def list_projects(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página; sem limite devolve todos"),
+    created_from: Optional[datetime] = Query(None, description="Criados a partir de"),
+    created_to: Optional[datetime] = Query(None, description="Criados antes de"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = filter_created_at(select(Project), Project, created_from, created_to)
+    projects = await paginate(db, stmt, Project, response, cursor, limit)
+    return fast_response([serialize_project(project) for project in projects], response)
 
 @router.get("/{project_id}", response_model=ProjectOut)
-def get_project(project_id: int = Path(..., description="ID do projeto"), db: Session = Depends(get_db)):
-    project = db.query(Project).filter(Project.id == project_id).first()
+async def get_project(project_id: int = Path(..., description="ID do projeto"), db: AsyncSession = Depends(get_async_db)):
+    project = await db.get(Project, project_id)
     
     if not project:
         raise HTTPException(
@@ -26,33 +44,126 @@ def get_project(project_id: int = Path(..., description="ID do projeto"), db: Se
     
     return project
 
+@router.get("/{project_id}/export")
+def export_project(
+    project_id: int = Path(..., description="ID do projeto"),
+    export_format: ExportFormatEnum = Query(ExportFormatEnum.ndjson, alias="format"),
+    db: Session = Depends(get_db),
+):
+    """
+    Exporta os voluntários do projeto com os metadados das digitais e os
+    resultados de detecção, transmitidos conforme são lidos do banco.
+    """
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Projeto com ID {project_id} não encontrado"
+        )
+
+    exporter, media_type = {
+        ExportFormatEnum.ndjson: (export_ndjson, "application/x-ndjson"),
+        ExportFormatEnum.csv: (export_csv, "text/csv; charset=utf-8"),
+    }[export_format]
+
+    def generate():
+        # A sessão da requisição já foi fechada quando a resposta é transmitida
+        session = SessionLocal()
+        try:
+            yield from exporter(session, project_id)
+        finally:
+            session.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="project-{project_id}.{export_format.value}"'},
+    )
+
+@router.get("/{project_id}/archive")
+def export_project_archive_file(
+    project_id: int = Path(..., description="ID do projeto"),
+    archive_format: ArchiveFormatEnum = Query(ArchiveFormatEnum.zip, alias="format"),
+    db: Session = Depends(get_db),
+):
+    """Pacote com as imagens e o manifest.json do projeto, no formato aceito por /import."""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Projeto com ID {project_id} não encontrado"
+        )
+
+    def generate():
+        session = SessionLocal()
+        try:
+            yield from export_project_archive(session, project_id, archive_format.value)
+        finally:
+            session.close()
+
+    media_type = "application/zip" if archive_format == ArchiveFormatEnum.zip else "application/x-tar"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="project-{project_id}.{archive_format.value}"'},
+    )
+
+@router.post("/{project_id}/import", response_model=ArchiveImportResult, status_code=201)
+def import_project(
+    project_id: int = Path(..., description="ID do projeto"),
+    archive: UploadFile = File(..., description=".zip ou .tar com manifest.json e as imagens"),
+    db: Session = Depends(get_db),
+):
+    """
+    Importa em lote voluntários e digitais de um pacote (.zip/.tar). O
+    manifest.json lista os voluntários (com uma `key`) e as digitais, que
+    apontam para o voluntário pela `key` e para as imagens pelo caminho no
+    pacote. O realce das digitais sem `image_filtered` vai para a fila.
+    """
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Projeto com ID {project_id} não encontrado"
+        )
+
+    backend = project.enhancement_backend or get_default_backend_name()
+    return import_project_archive(db, project_id, archive.file, backend)
+
 @router.post("/", response_model=ProjectOut)
-def create_project(user_id: Optional[str] = Form(None), name: str = Form(None), description: str = Form(None), db: Session = Depends(get_db)):
+async def create_project(
+        user_id: Optional[str] = Form(None),
+        name: str = Form(None),
+        description: str = Form(None),
+        enhancement_backend: Optional[str] = Form(None, description="Backend de realce das digitais do projeto"),
+        db: AsyncSession = Depends(get_async_db)
+    ):
     new_project = Project(
         name= name,
         description= description,
+        enhancement_backend=check_backend_name(enhancement_backend),
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow()
     )
     db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
+    await db.flush()
 
     if user_id:
         user_project = UserProject(user_id=int(user_id), project_id=new_project.id)
         db.add(user_project)
-        db.commit()
+    await db.commit()
 
     return new_project
 
 @router.put("/{project_id}", response_model=ProjectOut)
-def update_project(
+async def update_project(
         project_id: int = Path(..., description="ID do projeto"), 
         name: str = Form(None), 
         description: str = Form(None), 
-        db: Session = Depends(get_db)
+        enhancement_backend: Optional[str] = Form(None, description="Backend de realce das digitais do projeto"),
+        db: AsyncSession = Depends(get_async_db)
     ):
-    existing_project = db.query(Project).filter(Project.id == project_id).first()
+    existing_project = await db.get(Project, project_id)
     
     if not existing_project:
         raise HTTPException(
@@ -62,15 +173,15 @@ def update_project(
     
     existing_project.name = name
     existing_project.description = description
+    existing_project.enhancement_backend = check_backend_name(enhancement_backend)
     existing_project.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(existing_project)
+    await db.commit()
     return existing_project
 
 @router.delete("/{project_id}")
-def delete_project(project_id: int = Path(..., description="ID do projeto"), db: Session = Depends(get_db)):
-    project = db.query(Project).filter(Project.id == project_id).first()
+async def delete_project(project_id: int = Path(..., description="ID do projeto"), db: AsyncSession = Depends(get_async_db)):
+    project = await db.get(Project, project_id)
     
     if not project:
         raise HTTPException(
@@ -78,7 +189,7 @@ def delete_project(project_id: int = Path(..., description="ID do projeto"), db:
             detail=f"Projeto com ID {project_id} não encontrado"
         )
     
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
     
     return {"message": f"Projeto {project_id} deletado com sucesso"}
\ No newline at end of file
@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Path, Depends, HTTPException, status
+from fastapi import APIRouter, Path, Query, Depends, HTTPException, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from app.schemas.user import UserCreate, UserOut
+from typing import Optional
+from app.schemas.user import UserCreate, UserOut, serialize_user
 from app.models.user import User
 from app.schemas.project import ProjectOut
 from app.models.user_project import UserProject
-from app.db import get_db
+from app.db import get_async_db
+from app.constants.enum import UserRoles
+from app.utils.pagination import paginate, filter_created_at, MAX_PAGE_SIZE
+from app.utils.serialization import fast_response
 import jwt
 import os
 
@@ -14,6 +20,9 @@ router = APIRouter(prefix="/users", tags=["Users"])
 
 security = HTTPBearer()
 
+# Projetos de UserOut carregados junto com o usuário
+with_projects = selectinload(User.projects).selectinload(UserProject.project)
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     
     token = credentials.credentials
@@ -37,11 +46,19 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
             detail="Token inválido"
         )
 
-def get_current_user(
+async def get_user_or_none(db: AsyncSession, user_id: int):
+    return await db.scalar(
+        select(User)
+        .options(with_projects)
+        .where(User.id == user_id)
+        .execution_options(populate_existing=True)
+    )
+
+async def get_current_user(
     user_id: int = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await get_user_or_none(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -60,23 +77,36 @@ def to_user_out(user: User) -> UserOut:
     )
 
 @router.get("/me", response_model=UserOut)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return to_user_out(current_user)
 
 @router.get("/", response_model=list[UserOut])
-def list_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return [to_user_out(user) for user in users]
+async def list_users(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página; sem limite devolve todos"),
+    created_from: Optional[datetime] = Query(None, description="Criados a partir de"),
+    created_to: Optional[datetime] = Query(None, description="Criados antes de"),
+    role: Optional[UserRoles] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = select(User).options(with_projects)
+    if role is not None:
+        stmt = stmt.where(User.role == role)
+    stmt = filter_created_at(stmt, User, created_from, created_to)
+
+    users = await paginate(db, stmt, User, response, cursor, limit)
+    return fast_response([serialize_user(user) for user in users], response)
 
 @router.get("/{user_id}", response_model=UserOut)
-def get_user(user_id: int = Path(...), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_user(user_id: int = Path(...), db: AsyncSession = Depends(get_async_db)):
+    user = await get_user_or_none(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return to_user_out(user)
 
 @router.post("/", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     now = datetime.utcnow()
     new_user = User(
         name=user.name,
@@ -86,23 +116,22 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
         updated_at=now,
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.flush()
 
     if user.project_id:
         user_project = UserProject(user_id=new_user.id, project_id=user.project_id)
         db.add(user_project)
-        db.commit()
+    await db.commit()
 
-    return to_user_out(new_user)
+    return to_user_out(await get_user_or_none(db, new_user.id))
 
 @router.put("/{user_id}", response_model=UserOut)
-def update_user(
+async def update_user(
     user_id: int = Path(...),
     user: UserCreate = ...,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_user = db.query(User).filter(User.id == user_id).first()
+    db_user = await get_user_or_none(db, user_id)
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
@@ -110,16 +139,15 @@ def update_user(
     db_user.email = user.email
     db_user.updated_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     return to_user_out(db_user)
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int = Path(...), db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.id == user_id).first()
+async def delete_user(user_id: int = Path(...), db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.get(User, user_id)
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    await db.commit()
     return None
\ No newline at end of file
@@ -1,37 +1,34 @@
-from fastapi import APIRouter, Path, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from app.schemas.volunteer import VolunteerCreate, VolunteerOut
+from fastapi import APIRouter, Path, Query, Depends, HTTPException, Response
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.volunteer import VolunteerCreate, VolunteerOut, serialize_volunteer
 from datetime import datetime
 from app.models.volunteer import Volunteer
+from app.models.fingerprint import FINGERPRINT_METADATA_COLUMNS
 from app.constants.enum import VolunteerStatuses
-from app.db import get_db
+from app.db import get_async_db
+from app.utils.pagination import paginate, filter_created_at, MAX_PAGE_SIZE
+from app.utils.serialization import fast_response
 
 router = APIRouter(prefix="/volunteers", tags=["Volunteer"])
 
-@router.get("/", response_model=list[VolunteerOut])
-def list_volunteers(db: Session = Depends(get_db)):
-    volunteers = db.query(Volunteer).all()
-    return volunteers
+# Digitais de VolunteerOut carregadas junto, só os metadados (FingerprintSummary)
+with_fingerprints = selectinload(Volunteer.fingerprints).load_only(*FINGERPRINT_METADATA_COLUMNS)
 
-@router.get("/by-project/{project_id}", response_model=list[VolunteerOut])
-def list_volunteers_by_project(
-    project_id: int = Path(..., description="ID do projeto"),
-    db: Session = Depends(get_db)
-):
-    volunteers = db.query(Volunteer).filter(Volunteer.project_id == project_id).all()
+def filter_volunteers(stmt, status: Optional[VolunteerStatuses], created_from: Optional[datetime],
+                      created_to: Optional[datetime]):
+    if status is not None:
+        stmt = stmt.where(Volunteer.status == status)
+    return filter_created_at(stmt, Volunteer, created_from, created_to)
 
-    return volunteers
-
-@router.get("/{volunteer_id}", response_model=VolunteerOut)
-def get_volunteer(
-    volunteer_id: int = Path(..., description="ID do voluntário"),
-    db: Session = Depends(get_db),
-):
-    volunteer = (
-        db.query(Volunteer)
-        .options(joinedload(Volunteer.fingerprints))  # 👈 força carregar fingerprints
-        .filter(Volunteer.id == volunteer_id)
-        .first()
+async def get_volunteer_or_404(db: AsyncSession, volunteer_id: int) -> Volunteer:
+    volunteer = await db.scalar(
+        select(Volunteer)
+        .options(with_fingerprints)
+        .where(Volunteer.id == volunteer_id)
+        .execution_options(populate_existing=True)
     )
     
     if not volunteer:
@@ -42,8 +39,52 @@ def get_volunteer(
     
     return volunteer
 
+@router.get("/", response_model=list[VolunteerOut])
+async def list_volunteers(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página; sem limite devolve todos"),
+    created_from: Optional[datetime] = Query(None, description="Criados a partir de"),
+    created_to: Optional[datetime] = Query(None, description="Criados antes de"),
+    project_id: Optional[int] = Query(None),
+    status: Optional[VolunteerStatuses] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = select(Volunteer).options(with_fingerprints)
+    if project_id is not None:
+        stmt = stmt.where(Volunteer.project_id == project_id)
+    stmt = filter_volunteers(stmt, status, created_from, created_to)
+
+    volunteers = await paginate(db, stmt, Volunteer, response, cursor, limit)
+    return fast_response([serialize_volunteer(volunteer) for volunteer in volunteers], response)
+
+@router.get("/by-project/{project_id}", response_model=list[VolunteerOut])
+async def list_volunteers_by_project(
+    response: Response,
+    project_id: int = Path(..., description="ID do projeto"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página; sem limite devolve todos"),
+    created_from: Optional[datetime] = Query(None, description="Criados a partir de"),
+    created_to: Optional[datetime] = Query(None, description="Criados antes de"),
+    status: Optional[VolunteerStatuses] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    stmt = select(Volunteer).options(with_fingerprints).where(Volunteer.project_id == project_id)
+    stmt = filter_volunteers(stmt, status, created_from, created_to)
+
+    volunteers = await paginate(db, stmt, Volunteer, response, cursor, limit)
+
+    return fast_response([serialize_volunteer(volunteer) for volunteer in volunteers], response)
+
+@router.get("/{volunteer_id}", response_model=VolunteerOut)
+async def get_volunteer(
+    volunteer_id: int = Path(..., description="ID do voluntário"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await get_volunteer_or_404(db, volunteer_id)
+
 @router.post("/", response_model=VolunteerOut)
-def create_volunteer(volunteer: VolunteerCreate, db: Session = Depends(get_db)):
+async def create_volunteer(volunteer: VolunteerCreate, db: AsyncSession = Depends(get_async_db)):
     new_volunteer = Volunteer(
         name=volunteer.name,
         project_id=volunteer.project_id,
@@ -57,23 +98,16 @@ def create_volunteer(volunteer: VolunteerCreate, db: Session = Depends(get_db)):
         updated_at=datetime.now()
     )
     db.add(new_volunteer)
-    db.commit()
-    db.refresh(new_volunteer)
-    return new_volunteer
+    await db.commit()
+    return await get_volunteer_or_404(db, new_volunteer.id)
 
 @router.put("/{volunteer_id}", response_model=VolunteerOut)
-def update_volunteer(
+async def update_volunteer(
     volunteer: VolunteerCreate,
     volunteer_id: int = Path(..., description="ID do voluntário"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    existing_volunteer = db.query(Volunteer).filter(Volunteer.id == volunteer_id).first()
-    
-    if not existing_volunteer:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Voluntário com ID {volunteer_id} não encontrado"
-        )
+    existing_volunteer = await get_volunteer_or_404(db, volunteer_id)
     
     existing_volunteer.name = volunteer.name
     existing_volunteer.age = volunteer.age
@@ -85,13 +119,12 @@ def update_volunteer(
     existing_volunteer.project_id = volunteer.project_id
     existing_volunteer.updated_at = datetime.now()
     
-    db.commit()
-    db.refresh(existing_volunteer)
+    await db.commit()
     return existing_volunteer
 
 @router.delete("/{volunteer_id}")
-def delete_volunteer(volunteer_id: int = Path(..., description="ID do voluntário"), db: Session = Depends(get_db)):
-    volunteer = db.query(Volunteer).filter(Volunteer.id == volunteer_id).first()
+async def delete_volunteer(volunteer_id: int = Path(..., description="ID do voluntário"), db: AsyncSession = Depends(get_async_db)):
+    volunteer = await db.get(Volunteer, volunteer_id)
     
     if not volunteer:
         raise HTTPException(
@@ -99,7 +132,7 @@ def delete_volunteer(volunteer_id: int = Path(..., description="ID do voluntári
             detail=f"Voluntário com ID {volunteer_id} não encontrado"
         )
     
-    db.delete(volunteer)
-    db.commit()
+    await db.delete(volunteer)
+    await db.commit()
     
     return {"message": f"Voluntário {volunteer_id} deletado com sucesso"}
\ No newline at end of file
@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from app.constants.enum import GenderEnum, VolunteerStatuses, HandEnum, FingerEnum, PatternEnum
+
+class ManifestVolunteer(BaseModel):
+    key: str
+    name: str
+    age: Optional[int] = None
+    description: Optional[str] = None
+    gender: Optional[GenderEnum] = None
+    weight: Optional[float] = None
+    height: Optional[float] = None
+    phone: Optional[str] = None
+    status: Optional[VolunteerStatuses] = None
+
+class ManifestFingerprint(BaseModel):
+    volunteer: str
+    hand: HandEnum
+    finger: FingerEnum
+    pattern_type: Optional[PatternEnum] = None
+    delta: Optional[int] = None
+    number_of_lines: Optional[int] = None
+    notes: Optional[str] = None
+    # Caminhos dentro do arquivo
+    image: str
+    image_filtered: Optional[str] = None
+    image_processed: Optional[str] = None
+
+class ArchiveManifest(BaseModel):
+    version: int = 1
+    volunteers: List[ManifestVolunteer]
+    fingerprints: List[ManifestFingerprint]
+
+class ArchiveImportResult(BaseModel):
+    volunteers: int
+    fingerprints: int
+    queued: int
@@ -1,8 +1,9 @@
 from pydantic import BaseModel, field_serializer
 from datetime import datetime
 from typing import Optional
-from app.constants.enum import HandEnum, FingerEnum, PatternEnum
+from app.constants.enum import HandEnum, FingerEnum, PatternEnum, JobStatus
 from app.utils.to_base_64 import to_base64
+from app.utils.serialization import compile_serializer, constant
 
 class FingerprintCreate(BaseModel):
     volunteer_id: int
@@ -14,6 +15,21 @@ class FingerprintCreate(BaseModel):
     number_of_lines: Optional[int]
     notes: Optional[str]
 
+class FingerprintSummary(BaseModel):
+    """Digital sem as imagens, para listas aninhadas (ex.: VolunteerOut)."""
+    id: int
+    volunteer_id: int
+    hand: HandEnum
+    finger: FingerEnum
+    pattern_type: Optional[PatternEnum]
+    delta: Optional[int]
+    notes: Optional[str]
+    number_of_lines: Optional[int]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class FingerprintOut(BaseModel):
     id: int
     volunteer_id: int
@@ -23,9 +39,21 @@ class FingerprintOut(BaseModel):
     delta: Optional[int]
     notes: Optional[str]
     number_of_lines: Optional[int]
-    image_data: Optional[bytes]
-    image_filtered: Optional[bytes]
+    image_data: Optional[bytes] = None
+    image_filtered: Optional[bytes] = None
     image_processed: Optional[str] = None
+    image_data_url: Optional[str] = None
+    image_filtered_url: Optional[str] = None
+    image_processed_url: Optional[str] = None
+    image_normalized_url: Optional[str] = None
+    processing_status: Optional[JobStatus] = None
+    image_filtered_backend: Optional[str] = None
+    image_filtered_backend_version: Optional[str] = None
+    ingest_crop_x: Optional[int] = None
+    ingest_crop_y: Optional[int] = None
+    ingest_crop_width: Optional[int] = None
+    ingest_crop_height: Optional[int] = None
+    ingest_scale: Optional[float] = None
     created_at: datetime
 
     class Config:
@@ -33,4 +61,55 @@ class FingerprintOut(BaseModel):
 
     @field_serializer("image_data", "image_filtered", "image_processed")
     def encode_base64(self, value: Optional[bytes], _info):
-        return to_base64(value)
\ No newline at end of file
+        return to_base64(value)
+
+class IngestTransformOut(BaseModel):
+    """
+    Recorte (px da imagem original) e escala da imagem normalizada: um ponto
+    (x, y) da imagem processada fica em (x / scale + crop_x, y / scale + crop_y)
+    na original.
+    """
+    crop_x: int
+    crop_y: int
+    crop_width: int
+    crop_height: int
+    scale: float
+
+class ProcessingJobOut(BaseModel):
+    id: int
+    fingerprint_id: int
+    kind: str
+    backend: Optional[str] = None
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str]
+    run_after: datetime
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+# Listas a partir das linhas do ORM, sem validar cada item. Os campos que a
+# rota não preenche saem como None, como nos valores padrão do FingerprintOut
+_FINGERPRINT_EXTRAS = {
+    name: constant(None)
+    for name in (
+        "image_data_url", "image_filtered_url", "image_processed_url", "image_normalized_url", "processing_status",
+    )
+}
+serialize_fingerprint_metadata = compile_serializer(
+    FingerprintOut,
+    image_data=constant(None),
+    image_filtered=constant(None),
+    image_processed=constant(None),
+    **_FINGERPRINT_EXTRAS,
+)
+serialize_fingerprint = compile_serializer(
+    FingerprintOut,
+    image_data=lambda fp: to_base64(fp.image_data),
+    image_filtered=lambda fp: to_base64(fp.image_filtered),
+    image_processed=lambda fp: to_base64(fp.image_processed),
+    **_FINGERPRINT_EXTRAS,
+)
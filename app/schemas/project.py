@@ -1,10 +1,12 @@
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
+from app.utils.serialization import compile_serializer
 
 class ProjectBase(BaseModel):
     name: str
     description: Optional[str] = None
+    enhancement_backend: Optional[str] = None
 
 class ProjectCreate(ProjectBase):
     user_id: Optional[int] = None
@@ -18,4 +20,7 @@ class ProjectOut(ProjectBase):
     id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Listas a partir das linhas do ORM, sem validar cada item
+serialize_project = compile_serializer(ProjectOut)
@@ -1,7 +1,8 @@
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional, List
-from app.schemas.project import ProjectOut
+from app.schemas.project import ProjectOut, serialize_project
+from app.utils.serialization import compile_serializer
 from app.constants.enum import UserRoles
 
 class UserCreate(BaseModel):
@@ -20,3 +21,9 @@ class UserOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+# Listas a partir das linhas do ORM; os projetos vêm pela tabela user_projects
+serialize_user = compile_serializer(
+    UserOut,
+    projects=lambda user: [serialize_project(up.project) for up in user.projects],
+)
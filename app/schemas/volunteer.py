@@ -2,7 +2,8 @@ from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional, List
 from app.constants.enum import GenderEnum, VolunteerStatuses
-from app.schemas.fingerprint import FingerprintOut
+from app.schemas.fingerprint import FingerprintSummary
+from app.utils.serialization import compile_serializer
 
 class VolunteerCreate(BaseModel):
     name: str
@@ -27,7 +28,10 @@ class VolunteerOut(BaseModel):
     status: Optional[VolunteerStatuses]
     created_at: datetime
     updated_at: datetime
-    fingerprints: List[FingerprintOut] = []
+    fingerprints: List[FingerprintSummary] = []
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+# Listas a partir das linhas do ORM (digitais já carregadas), sem validar cada item
+serialize_volunteer = compile_serializer(VolunteerOut)
@@ -0,0 +1,121 @@
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from typing import Iterator, Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from app.constants.enum import ImageTypeEnum
+from app.models.fingerprint import Fingerprint
+from app.models.volunteer import Volunteer
+from app.utils.detection_cache import (
+    get_cached_detection, store_detection, make_params_key,
+    get_fingerprint_image_hash, load_image_handle,
+)
+from app.utils.field_cache import get_cached_fields, store_fields
+from app.utils.fingerprint_detector import SimpleFingerprintDetector, SingularPointParams, detect_image
+
+
+def select_fingerprint_ids(db: Session, project_id: Optional[int] = None,
+                           volunteer_id: Optional[int] = None,
+                           fingerprint_ids: Optional[list[int]] = None) -> list[int]:
+    query = db.query(Fingerprint.id)
+
+    if project_id is not None:
+        query = query.join(Volunteer, Fingerprint.volunteer_id == Volunteer.id).filter(
+            Volunteer.project_id == project_id
+        )
+    if volunteer_id is not None:
+        query = query.filter(Fingerprint.volunteer_id == volunteer_id)
+    if fingerprint_ids is not None:
+        query = query.filter(Fingerprint.id.in_(fingerprint_ids))
+
+    return [row.id for row in query.order_by(Fingerprint.id)]
+
+
+def run_batch_detection(
+    db: Session,
+    fingerprint_ids: list[int],
+    executor: Executor,
+    image_type: ImageTypeEnum = ImageTypeEnum.filtered,
+    block_size: int = 16,
+    min_coherence: float = 0.5,
+    stride: Optional[int] = None,
+    params: Optional[SingularPointParams] = None,
+    pyramid: bool = False,
+    update_delta: bool = False,
+    max_in_flight: int = 8,
+) -> Iterator[dict]:
+    """
+    Detecta os pontos singulares de várias digitais, distribuindo as imagens
+    que não estão em cache entre os processos do `executor`.
+
+    Os resultados saem na ordem em que terminam. No máximo `max_in_flight`
+    imagens ficam carregadas em memória ao mesmo tempo.
+
+    Yields:
+        dict: {'fingerprint_id', 'deltas', 'cores', 'cached'} ou
+        {'fingerprint_id', 'error'}
+    """
+    params = params or SingularPointParams()
+    params_key = make_params_key(block_size, min_coherence, stride, params, pyramid)
+    pending = {}
+
+    def finish(fingerprint_id: int, deltas: list, cores: list, cached: bool) -> dict:
+        if update_delta:
+            db.query(Fingerprint).filter(Fingerprint.id == fingerprint_id).update(
+                {Fingerprint.delta: len(deltas)}, synchronize_session=False
+            )
+            db.commit()
+        return {'fingerprint_id': fingerprint_id, 'deltas': deltas, 'cores': cores, 'cached': cached}
+
+    def collect(done) -> Iterator[dict]:
+        for future in done:
+            fingerprint_id, image_hash = pending.pop(future)
+            try:
+                deltas, cores, fields = future.result()
+            except Exception as e:
+                yield {'fingerprint_id': fingerprint_id, 'error': str(e)}
+                continue
+
+            if fields is not None:
+                store_fields(db, fingerprint_id, image_hash, block_size, stride, fields)
+            deltas, cores = store_detection(db, fingerprint_id, image_hash, params_key, deltas, cores)
+            yield finish(fingerprint_id, deltas, cores, cached=False)
+
+    for fingerprint_id in fingerprint_ids:
+        try:
+            fingerprint, image_hash, image_bytes = get_fingerprint_image_hash(
+                db, fingerprint_id, image_type
+            )
+
+            cached = get_cached_detection(db, image_hash, params_key)
+            if cached is not None:
+                yield finish(fingerprint_id, *cached, cached=True)
+                continue
+
+            fields = None if pyramid else get_cached_fields(db, image_hash, block_size, stride)
+            if fields is not None:
+                # Só a etapa final roda, e ela é barata o bastante para o processo atual
+                _, coherence, poincare = fields
+                deltas, cores = SimpleFingerprintDetector.detect_from_fields(
+                    poincare, coherence, block_size, min_coherence, stride, params
+                )
+                deltas, cores = store_detection(db, fingerprint_id, image_hash, params_key, deltas, cores)
+                yield finish(fingerprint_id, deltas, cores, cached=True)
+                continue
+
+            image = load_image_handle(fingerprint, image_type, image_hash, image_bytes)
+        except HTTPException as e:
+            yield {'fingerprint_id': fingerprint_id, 'error': e.detail}
+            continue
+
+        future = executor.submit(
+            detect_image, image, block_size, min_coherence, stride, params, pyramid
+        )
+        pending[future] = (fingerprint_id, image_hash)
+
+        while len(pending) >= max_in_flight:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        yield from collect(done)
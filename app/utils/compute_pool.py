@@ -0,0 +1,130 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Optional
+from fastapi import HTTPException
+
+
+def get_pool_size() -> int:
+    return int(os.getenv("COMPUTE_WORKERS", os.cpu_count() or 1))
+
+
+def get_queue_depth() -> int:
+    return int(os.getenv("COMPUTE_QUEUE_DEPTH", 4 * get_pool_size()))
+
+
+class ComputeExecutor(Executor):
+    """
+    Pool de processos para o processamento de imagens (realce, detecção), fora
+    do event loop. Usa "spawn" para que os processos não herdem conexões nem
+    threads do servidor.
+
+    `run` é o caminho das requisições: recusa a tarefa com 503 quando já há
+    `max_workers + max_queue` tarefas em andamento, em vez de deixar a fila
+    crescer sem limite. `submit` não recusa; quem usa (o lote) limita a
+    própria quantidade de tarefas.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = self._create_pool()
+        self._lock = Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        with self._lock:
+            self._in_flight += 1
+        try:
+            pool = self._pool
+            try:
+                future = pool.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                # Um processo morreu (ex.: falta de memória); recria o pool
+                future = self._replace_broken_pool(pool).submit(fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+
+        future.add_done_callback(self._task_done)
+        return future
+
+    def _replace_broken_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """
+        Troca o pool quebrado por um novo. Requisições que encontram o mesmo
+        pool quebrado ao mesmo tempo criam um único substituto.
+        """
+        with self._lock:
+            if self._pool is broken:
+                self._pool = self._create_pool()
+                broken.shutdown(wait=False)
+            return self._pool
+
+    def _task_done(self, future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Executa `fn` num processo do pool e aguarda o resultado sem bloquear o event loop."""
+        with self._lock:
+            full = self._in_flight >= self.max_workers + self.max_queue
+            if full:
+                self._rejected += 1
+        if full:
+            raise HTTPException(
+                status_code=503,
+                detail="Fila de processamento cheia, tente novamente em instantes",
+                headers={"Retry-After": "5"},
+            )
+
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "busy_workers": min(in_flight, self.max_workers),
+                "queue_length": max(0, in_flight - self.max_workers),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+_executor: Optional[ComputeExecutor] = None
+
+
+def get_compute_executor() -> ComputeExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ComputeExecutor(get_pool_size(), get_queue_depth())
+    return _executor
+
+
+def shutdown_compute_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
@@ -0,0 +1,155 @@
+import os
+import cv2
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from app.utils.lru_cache import LRUCache
+from app.utils.orientation_field import block_orientation_field
+
+# Janelas de TILE_SIZE pixels deslocadas de TILE_STEP (50% de sobreposição)
+TILE_SIZE = 32
+TILE_STEP = TILE_SIZE // 2
+
+# Quantização do filtro: orientações em [0, π) e períodos das cristas em pixels
+ORIENTATION_BINS = 16
+MIN_PERIOD, MAX_PERIOD, PERIOD_STEP = 3.0, 16.0, 0.5
+
+# Respostas em frequência dos filtros por (orientação, período) quantizados
+_filters = LRUCache(int(os.getenv("ENHANCER_FILTER_CACHE_SIZE", "512")))
+
+
+def _tile_window(size: int = TILE_SIZE) -> np.ndarray:
+    """
+    Raiz da janela de Hann periódica: aplicada na análise e na síntese, a
+    sobreposição de 50% soma uma janela de Hann inteira, que é constante.
+    """
+    hann = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(size) / size)
+    return np.sqrt(np.outer(hann, hann)).astype(np.float32)
+
+
+WINDOW = _tile_window()
+
+# Frequências (ciclos/pixel) de cada posição do espectro rfft2 de um tile
+FREQ_Y, FREQ_X = np.meshgrid(
+    np.fft.fftfreq(TILE_SIZE), np.fft.rfftfreq(TILE_SIZE), indexing="ij"
+)
+FREQ_RADIUS = np.hypot(FREQ_Y, FREQ_X)
+
+
+def contextual_filter(orientation_bin: int, period_bin: int) -> np.ndarray:
+    """
+    Resposta em frequência do filtro de Gabor orientado: uma gaussiana em
+    torno da frequência das cristas, na direção normal a elas, e estreita na
+    direção das cristas. Calculada uma vez por par quantizado.
+    """
+    key = (orientation_bin, period_bin)
+    response = _filters.get(key)
+    if response is None:
+        normal = orientation_bin * np.pi / ORIENTATION_BINS
+        frequency = 1.0 / (MIN_PERIOD + period_bin * PERIOD_STEP)
+        across = FREQ_X * np.cos(normal) + FREQ_Y * np.sin(normal)
+        along = -FREQ_X * np.sin(normal) + FREQ_Y * np.cos(normal)
+        radial_sigma = frequency / 3
+        angular_sigma = frequency / 2.5
+        response = np.exp(
+            -(np.abs(across) - frequency) ** 2 / (2 * radial_sigma ** 2)
+            - along ** 2 / (2 * angular_sigma ** 2)
+        ).astype(np.float32)
+        response[0, 0] = 0.0
+        _filters.put(key, response)
+    return response
+
+
+def _smooth_orientation(orientation: np.ndarray, coherence: np.ndarray) -> np.ndarray:
+    """Suaviza o campo (em ângulo dobrado, pesado pela coerência) entre blocos vizinhos."""
+    cos2 = cv2.GaussianBlur((coherence * np.cos(2 * orientation)).astype(np.float32), (5, 5), 1.0)
+    sin2 = cv2.GaussianBlur((coherence * np.sin(2 * orientation)).astype(np.float32), (5, 5), 1.0)
+    return 0.5 * np.arctan2(sin2, cos2)
+
+
+def _estimate_period(spectra: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Período das cristas por tile: o pico de energia do espectro na faixa de
+    períodos plausíveis, suavizado pela mediana dos vizinhos. Tiles fora da
+    digital recebem a mediana dos válidos.
+    """
+    band = (FREQ_RADIUS >= 1.0 / MAX_PERIOD) & (FREQ_RADIUS <= 1.0 / MIN_PERIOD)
+    energy = np.abs(spectra) ** 2 * band
+    peak = energy.reshape(*energy.shape[:2], -1).argmax(axis=-1)
+    period = 1.0 / np.maximum(FREQ_RADIUS.ravel()[peak], 1e-6)
+
+    fallback = np.median(period[valid]) if valid.any() else (MIN_PERIOD + MAX_PERIOD) / 2
+    period = np.where(valid, period, fallback).astype(np.float32)
+    return np.clip(cv2.medianBlur(period, 3), MIN_PERIOD, MAX_PERIOD)
+
+
+def enhance_contextual(img: np.ndarray, mask_threshold: float = 0.25) -> np.ndarray:
+    """
+    Realce contextual no domínio da frequência (normalização, orientação,
+    frequência, máscara e filtragem, como em best-filters.md).
+
+    A imagem é dividida em tiles de 32x32 com 50% de sobreposição. Todos os
+    tiles vão por uma única FFT em lote; cada um é multiplicado pelo filtro
+    da sua orientação e período (memoizados por par quantizado) e volta por
+    uma única IFFT em lote, somado aos vizinhos com a janela de síntese.
+
+    Args:
+        img (np.ndarray): Imagem uint8 em escala de cinza
+        mask_threshold (float): Desvio padrão mínimo (imagem normalizada) de um tile da digital
+
+    Returns:
+        np.ndarray: Imagem binária uint8, cristas em 255
+    """
+    h, w = img.shape
+
+    # 1. Normalização (média 0, desvio 1) e borda para cobrir a imagem toda com tiles
+    normalized = img.astype(np.float32)
+    normalized = (normalized - normalized.mean()) / (normalized.std() + 1e-6)
+    pad_h = (-h) % TILE_STEP + TILE_STEP
+    pad_w = (-w) % TILE_STEP + TILE_STEP
+    padded = cv2.copyMakeBorder(
+        normalized, TILE_STEP, pad_h, TILE_STEP, pad_w, cv2.BORDER_REFLECT
+    )
+
+    tiles = sliding_window_view(padded, (TILE_SIZE, TILE_SIZE))[::TILE_STEP, ::TILE_STEP]
+    tiles_h, tiles_w = tiles.shape[:2]
+
+    # 2. Máscara da região da digital: tiles com contraste
+    valid = tiles.std(axis=(-2, -1)) > mask_threshold
+    valid = cv2.morphologyEx(valid.astype(np.uint8), cv2.MORPH_OPEN, np.ones((3, 3), np.uint8)).astype(bool)
+
+    # 3. Orientação (normal às cristas) por tile, dos mesmos 32x32 pixels
+    gx = cv2.Sobel(padded, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(padded, cv2.CV_32F, 0, 1, ksize=3)
+    orientation, coherence = block_orientation_field(gx, gy, TILE_SIZE, TILE_STEP)
+    orientation = _smooth_orientation(orientation[:tiles_h, :tiles_w], coherence[:tiles_h, :tiles_w])
+
+    # 4. Frequência das cristas pelo espectro de cada tile
+    spectra = np.fft.rfft2(tiles * WINDOW)
+    period = _estimate_period(spectra, valid)
+
+    # 5. Filtragem: filtro de cada tile pelo par (orientação, período) quantizado
+    orientation_bins = np.round(np.mod(orientation, np.pi) / np.pi * ORIENTATION_BINS).astype(int) % ORIENTATION_BINS
+    period_bins = np.round((period - MIN_PERIOD) / PERIOD_STEP).astype(int)
+    keys, inverse = np.unique(orientation_bins * 1000 + period_bins, return_inverse=True)
+    bank = np.stack([contextual_filter(key // 1000, key % 1000) for key in keys])
+    filtered = np.fft.irfft2(spectra * bank[inverse.reshape(tiles_h, tiles_w)], s=(TILE_SIZE, TILE_SIZE))
+    filtered *= WINDOW
+
+    # Soma com sobreposição: cada quadrante 16x16 de um tile cai num bloco da saída
+    out = np.zeros((tiles_h + 1, TILE_STEP, tiles_w + 1, TILE_STEP), dtype=np.float32)
+    quadrants = filtered.reshape(tiles_h, tiles_w, 2, TILE_STEP, 2, TILE_STEP)
+    for qy in (0, 1):
+        for qx in (0, 1):
+            out[qy:qy + tiles_h, :, qx:qx + tiles_w, :] += quadrants[:, :, qy, :, qx, :].transpose(0, 2, 1, 3)
+    out = out.reshape((tiles_h + 1) * TILE_STEP, (tiles_w + 1) * TILE_STEP)
+
+    # Máscara por pixel: união dos tiles válidos que cobrem cada bloco 16x16
+    block_mask = np.zeros((tiles_h + 1, tiles_w + 1), dtype=bool)
+    for qy in (0, 1):
+        for qx in (0, 1):
+            block_mask[qy:qy + tiles_h, qx:qx + tiles_w] |= valid
+    pixel_mask = np.repeat(np.repeat(block_mask, TILE_STEP, axis=0), TILE_STEP, axis=1)
+
+    # Cristas escuras na entrada: resposta negativa do filtro
+    ridges = (out < 0) & pixel_mask
+    return (ridges[TILE_STEP:TILE_STEP + h, TILE_STEP:TILE_STEP + w] * 255).astype(np.uint8)
@@ -0,0 +1,130 @@
+import os
+import time
+from bisect import bisect_left
+from threading import Lock
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Limites (em segundos) das faixas do histograma de espera por conexão
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+def get_pool_size() -> int:
+    return int(os.getenv("DB_POOL_SIZE", "5"))
+
+
+def get_max_overflow() -> int:
+    return int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+
+def get_pool_timeout() -> float:
+    return float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def get_pool_recycle() -> int:
+    return int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def get_pool_pre_ping() -> bool:
+    return os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+
+class WaitHistogram:
+    """Tempo de espera por uma conexão do pool, em faixas acumuladas até cada limite."""
+
+    def __init__(self, buckets=WAIT_BUCKETS):
+        self.buckets = buckets
+        self._lock = Lock()
+        self._counts = [0] * (len(buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._timeouts = 0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, seconds)] += 1
+            self._count += 1
+            self._sum += seconds
+            self._max = max(self._max, seconds)
+
+    def timeout(self) -> None:
+        with self._lock:
+            self._timeouts += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for limit, count in zip([*map(str, self.buckets), "+Inf"], self._counts):
+                cumulative += count
+                buckets[limit] = cumulative
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "max": self._max,
+                "timeouts": self._timeouts,
+                "buckets": buckets,
+            }
+
+
+class InstrumentedPoolMixin:
+    """
+    Mede quanto cada checkout espera por uma conexão: perto de zero quando há
+    conexão livre, até `pool_timeout` quando o pool e o overflow estão esgotados.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_histogram = WaitHistogram()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_histogram.timeout()
+            raise
+        self.wait_histogram.observe(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_pool_options(asynchronous: bool = False) -> dict:
+    """
+    Argumentos de pool para create_engine/create_async_engine, lidos do
+    ambiente. `pool_pre_ping` descarta conexões mortas (ex.: Postgres
+    reiniciado) antes de entregá-las; `pool_recycle` renova as mais antigas.
+    """
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool,
+        "pool_size": get_pool_size(),
+        "max_overflow": get_max_overflow(),
+        "pool_timeout": get_pool_timeout(),
+        "pool_recycle": get_pool_recycle(),
+        "pool_pre_ping": get_pool_pre_ping(),
+    }
+
+
+def pool_stats(engine) -> dict:
+    """Ocupação do pool da engine: conexões em uso, overflow e histograma de espera."""
+    pool = engine.pool
+    stats = {
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # Negativo enquanto o pool ainda não abriu todas as `pool_size` conexões
+        "overflow": pool.overflow(),
+    }
+    if isinstance(pool, InstrumentedPoolMixin):
+        stats["wait_seconds"] = pool.wait_histogram.stats()
+    return stats
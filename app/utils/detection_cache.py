@@ -0,0 +1,178 @@
+import json
+import os
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from app.constants.enum import ImageTypeEnum
+from app.models.detection import SingularPointDetection
+from app.models.fingerprint import Fingerprint
+from app.utils.image_hash import sha256_hex
+from app.utils.image_handle import ImageHandle
+from app.utils.image_store import get_image_store
+from app.utils.lru_cache import LRUCache
+
+# Resultados recentes ficam em memória na frente da tabela
+_results = LRUCache(int(os.getenv("DETECTION_CACHE_SIZE", "1024")))
+
+IMAGE_COLUMNS = {
+    ImageTypeEnum.raw: ("image_data", "image_data_hash"),
+    ImageTypeEnum.filtered: ("image_filtered", "image_filtered_hash"),
+}
+NORMALIZED_COLUMNS = ("image_normalized", "image_normalized_hash")
+
+
+def image_columns(fingerprint: Fingerprint, image_type: ImageTypeEnum) -> tuple[str, str]:
+    """
+    Colunas (imagem, hash) processadas para `image_type`: a imagem bruta é a
+    versão normalizada na ingestão (app.utils.ingest), quando a digital tem.
+    """
+    if image_type == ImageTypeEnum.raw and fingerprint.image_normalized_hash is not None:
+        return NORMALIZED_COLUMNS
+    return IMAGE_COLUMNS[image_type]
+
+
+def load_image_bytes(fingerprint: Fingerprint, image_type: ImageTypeEnum) -> bytes:
+    column, _ = image_columns(fingerprint, image_type)
+    image_bytes = getattr(fingerprint, column)
+    if not image_bytes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A fingerprint não possui imagem {image_type.value} ({column})"
+        )
+    return image_bytes
+
+
+def load_image_handle(fingerprint: Fingerprint, image_type: ImageTypeEnum, image_hash: str,
+                      image_bytes: Optional[bytes] = None) -> ImageHandle:
+    """
+    Imagem para a detecção. Quando ela está no armazenamento vai só o hash:
+    o worker lê os bytes de lá apenas se não tiver o array no cache. Digitais
+    não migradas levam os bytes da coluna antiga.
+    """
+    if image_bytes is None and not get_image_store().exists(image_hash):
+        image_bytes = load_image_bytes(fingerprint, image_type)
+    return ImageHandle(image_bytes, image_hash)
+
+
+def get_fingerprint_image_hash(db: Session, fingerprint_id: int, image_type: ImageTypeEnum):
+    """
+    Busca a digital (sem os bytes das imagens) e devolve o hash da imagem pedida.
+
+    Returns:
+        tuple: (fingerprint, image_hash, image_bytes); image_bytes só vem
+        preenchido quando a imagem precisou ser lida para calcular o hash
+    """
+    fingerprint = db.query(Fingerprint).filter(
+        Fingerprint.id == fingerprint_id
+    ).first()
+    
+    if not fingerprint:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Fingerprint com ID {fingerprint_id} não encontrada"
+        )
+    
+    _, hash_column = image_columns(fingerprint, image_type)
+    image_bytes = None
+    image_hash = getattr(fingerprint, hash_column)
+    
+    if image_hash is None:
+        # Digitais gravadas antes do cache: calcula e guarda o hash
+        image_bytes = load_image_bytes(fingerprint, image_type)
+        image_hash = sha256_hex(image_bytes)
+        setattr(fingerprint, hash_column, image_hash)
+        db.commit()
+    
+    return fingerprint, image_hash, image_bytes
+
+
+def make_params_key(block_size: int, min_coherence: float, stride: Optional[int],
+                    params, pyramid: bool) -> str:
+    """Serializa os parâmetros da detecção de forma canônica."""
+    return json.dumps(
+        {
+            "block_size": block_size,
+            "min_coherence": min_coherence,
+            "stride": stride,
+            "params": params.model_dump(mode="json"),
+            "pyramid": pyramid,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+
+
+def get_cached_detection(db: Session, image_hash: str, params_key: str) -> Optional[tuple[list, list]]:
+    """
+    Busca o resultado de uma detecção já feita para a mesma imagem e parâmetros.
+
+    Returns:
+        tuple | None: (deltas, cores) como listas de {'x', 'y'}, ou None
+    """
+    key = (image_hash, params_key)
+    cached = _results.get(key)
+    if cached is not None:
+        return cached
+
+    row = (
+        db.query(SingularPointDetection.deltas, SingularPointDetection.cores)
+        .filter(
+            SingularPointDetection.image_hash == image_hash,
+            SingularPointDetection.params_key == params_key,
+        )
+        .first()
+    )
+    if row is None:
+        return None
+
+    result = (row.deltas, row.cores)
+    _results.put(key, result)
+    return result
+
+
+def store_detection(db: Session, fingerprint_id: int, image_hash: str, params_key: str,
+                    deltas: list, cores: list) -> tuple[list, list]:
+    """
+    Grava o resultado de uma detecção, mantendo só as coordenadas dos pontos.
+
+    Returns:
+        tuple: (deltas, cores) como gravados
+    """
+    deltas = [{'x': p['x'], 'y': p['y']} for p in deltas]
+    cores = [{'x': p['x'], 'y': p['y']} for p in cores]
+    _results.put((image_hash, params_key), (deltas, cores))
+
+    db.add(SingularPointDetection(
+        fingerprint_id=fingerprint_id,
+        image_hash=image_hash,
+        params_key=params_key,
+        deltas=deltas,
+        cores=cores,
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Outra requisição gravou o mesmo resultado antes
+        db.rollback()
+
+    return deltas, cores
+
+
+def invalidate_fingerprint_detections(db: Session, fingerprint: Fingerprint) -> None:
+    """
+    Remove os resultados gravados para imagens que a digital não tem mais.
+    As entradas em memória são indexadas pelo hash do conteúdo, então nunca
+    ficam desatualizadas e apenas expiram pelo LRU.
+    """
+    current = {
+        fingerprint.image_data_hash, fingerprint.image_normalized_hash, fingerprint.image_filtered_hash,
+    } - {None}
+    (
+        db.query(SingularPointDetection)
+        .filter(
+            SingularPointDetection.fingerprint_id == fingerprint.id,
+            SingularPointDetection.image_hash.notin_(current),
+        )
+        .delete(synchronize_session=False)
+    )
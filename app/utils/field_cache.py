@@ -0,0 +1,107 @@
+import io
+import os
+from typing import Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from app.models.detection import OrientationField
+from app.models.fingerprint import Fingerprint
+from app.utils.lru_cache import LRUCache
+
+# Campos recentes ficam em memória, já decodificados
+_fields = LRUCache(int(os.getenv("FIELD_CACHE_SIZE", "64")))
+
+# Tipos usados na gravação. A orientação não entra na detecção e a coerência
+# só é comparada com limiares; o Poincaré fica em float64 porque o refinamento
+# da posição desempata valores que diferem só nas últimas casas
+FIELD_DTYPES = {
+    "orientation": np.float16,
+    "coherence": np.float32,
+    "poincare": np.float64,
+}
+
+
+def encode_array(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def decode_array(data: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+
+def compact_fields(orientation: np.ndarray, coherence: np.ndarray, poincare: np.ndarray):
+    """Converte os campos para os tipos compactos usados na gravação."""
+    return (
+        orientation.astype(FIELD_DTYPES["orientation"]),
+        coherence.astype(FIELD_DTYPES["coherence"]),
+        poincare.astype(FIELD_DTYPES["poincare"]),
+    )
+
+
+def get_cached_fields(db: Session, image_hash: str, block_size: int, stride: Optional[int] = None):
+    """
+    Busca os campos (orientation, coherence, poincare) já calculados para a
+    imagem e a grade de blocos.
+
+    Returns:
+        tuple | None: Campos nos tipos compactos, ou None
+    """
+    step = stride or block_size
+    key = (image_hash, block_size, step)
+    cached = _fields.get(key)
+    if cached is not None:
+        return cached
+
+    row = (
+        db.query(OrientationField)
+        .filter(
+            OrientationField.image_hash == image_hash,
+            OrientationField.block_size == block_size,
+            OrientationField.stride == step,
+        )
+        .first()
+    )
+    if row is None:
+        return None
+
+    fields = (decode_array(row.orientation), decode_array(row.coherence), decode_array(row.poincare))
+    _fields.put(key, fields)
+    return fields
+
+
+def store_fields(db: Session, fingerprint_id: int, image_hash: str, block_size: int,
+                 stride: Optional[int], fields: tuple) -> None:
+    step = stride or block_size
+    orientation, coherence, poincare = fields
+    _fields.put((image_hash, block_size, step), fields)
+
+    db.add(OrientationField(
+        fingerprint_id=fingerprint_id,
+        image_hash=image_hash,
+        block_size=block_size,
+        stride=step,
+        orientation=encode_array(orientation),
+        coherence=encode_array(coherence),
+        poincare=encode_array(poincare),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+
+def invalidate_fingerprint_fields(db: Session, fingerprint: Fingerprint) -> None:
+    """Remove os campos gravados para imagens que a digital não tem mais."""
+    current = {
+        fingerprint.image_data_hash, fingerprint.image_normalized_hash, fingerprint.image_filtered_hash,
+    } - {None}
+    (
+        db.query(OrientationField)
+        .filter(
+            OrientationField.fingerprint_id == fingerprint.id,
+            OrientationField.image_hash.notin_(current),
+        )
+        .delete(synchronize_session=False)
+    )
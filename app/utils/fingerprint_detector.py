@@ -0,0 +1,353 @@
+import cv2
+import numpy as np
+from scipy import ndimage
+from pydantic import BaseModel, Field
+from app.utils.orientation_field import block_orientation_field, poincare_index, mask_poincare
+from app.utils.spatial_grid import suppress_nearby_points
+from app.utils.field_cache import compact_fields
+from app.utils.image_handle import ImageHandle, as_image_handle
+
+
+class SingularPointParams(BaseModel):
+    """Limiares usados na seleção de deltas e núcleos no campo de Poincaré."""
+    delta_min: float = -0.55
+    delta_max: float = -0.45
+    core_min: float = 0.45
+    core_max: float = 0.55
+    min_coherence_delta: float = 0.65
+    min_coherence_core: float = 0.75
+    min_avg_coherence_delta: float = 0.55
+    min_avg_coherence_core: float = 0.70
+    high_coherence: float = 0.65
+    min_high_coherence_count: int = 15
+    margin: int = Field(4, ge=0)
+    window_radius: int = Field(2, ge=0)
+    local_threshold: float = 0.98
+
+
+class SimpleFingerprintDetector:
+    def __init__(self, image_array):
+        self.image = image_array
+        if self.image is None or self.image.size == 0:
+            raise ValueError("Imagem inválida")
+        
+        self.height, self.width = self.image.shape
+    
+    def compute_gradients(self):
+        self.gx = cv2.Sobel(self.image, cv2.CV_64F, 1, 0, ksize=3)
+        self.gy = cv2.Sobel(self.image, cv2.CV_64F, 0, 1, ksize=3)
+    
+    def compute_orientation_field(self, block_size=16, stride=None):
+        orientation, coherence = block_orientation_field(
+            self.gx, self.gy, block_size, stride
+        )
+        
+        return orientation, coherence, block_size
+    
+    def smooth_orientation(self, orientation, sigma=1.5):
+        sin_ori = np.sin(2 * orientation)
+        cos_ori = np.cos(2 * orientation)
+        
+        sin_smooth = ndimage.gaussian_filter(sin_ori, sigma)
+        cos_smooth = ndimage.gaussian_filter(cos_ori, sigma)
+        
+        orientation_smooth = 0.5 * np.arctan2(sin_smooth, cos_smooth)
+        return orientation_smooth
+    
+    def compute_poincare_index(self, orientation, coherence, min_coherence=0.5):
+        return poincare_index(orientation, coherence, min_coherence)
+    
+    @staticmethod
+    def refine_position(poincare, i, j, search_type='delta', radius=2):
+        h, w = poincare.shape
+        
+        i_min = max(0, i - radius)
+        i_max = min(h, i + radius + 1)
+        j_min = max(0, j - radius)
+        j_max = min(w, j + radius + 1)
+        
+        region = poincare[i_min:i_max, j_min:j_max]
+        
+        if search_type == 'delta':
+            local_min_idx = np.unravel_index(np.argmin(region), region.shape)
+            refined_i = i_min + local_min_idx[0]
+            refined_j = j_min + local_min_idx[1]
+        else:
+            local_max_idx = np.unravel_index(np.argmax(region), region.shape)
+            refined_i = i_min + local_max_idx[0]
+            refined_j = j_min + local_max_idx[1]
+        
+        return refined_i, refined_j
+    
+    @staticmethod
+    def find_singular_points(poincare, coherence, block_size, stride=None, params=None):
+        params = params or SingularPointParams()
+        h, w = poincare.shape
+        step = stride or block_size
+        
+        deltas = []
+        cores = []
+        
+        radius = params.window_radius
+        size = 2 * radius + 1
+        margin = max(params.margin, radius)
+        
+        if h <= 2 * margin or w <= 2 * margin:
+            return deltas, cores
+        
+        inside = np.zeros((h, w), dtype=bool)
+        inside[margin:h - margin, margin:w - margin] = True
+        
+        # Estatísticas da janela local de todos os blocos de uma vez
+        local_abs_max = ndimage.maximum_filter(np.abs(poincare), size=size)
+        local_max = ndimage.maximum_filter(poincare, size=size)
+        mean_coherence = ndimage.uniform_filter(coherence, size=size)
+        high_coherence_count = ndimage.correlate(
+            (coherence > params.high_coherence).astype(np.float64),
+            np.ones((size, size)),
+            mode="constant",
+        )
+        
+        # A média do uniform_filter só faz a triagem; a média exata é
+        # recalculada para os poucos candidatos que sobram
+        tolerance = 1e-9
+        
+        delta_range = (params.delta_min < poincare) & (poincare < params.delta_max)
+        core_range = (params.core_min < poincare) & (poincare < params.core_max) & ~delta_range
+        
+        delta_mask = (
+            inside & delta_range
+            & ~(coherence < params.min_coherence_delta)
+            & (np.abs(poincare) >= local_abs_max * params.local_threshold)
+            & (mean_coherence >= params.min_avg_coherence_delta - tolerance)
+        )
+        core_mask = (
+            inside & core_range
+            & ~(coherence < params.min_coherence_core)
+            & (poincare >= local_max * params.local_threshold)
+            & (mean_coherence >= params.min_avg_coherence_core - tolerance)
+            & (high_coherence_count >= params.min_high_coherence_count)
+        )
+        
+        for search_type, mask, min_avg, points in (
+            ('delta', delta_mask, params.min_avg_coherence_delta, deltas),
+            ('core', core_mask, params.min_avg_coherence_core, cores),
+        ):
+            for i, j in zip(*np.nonzero(mask)):
+                avg_coherence = np.mean(coherence[i-radius:i+radius+1, j-radius:j+radius+1])
+                if avg_coherence < min_avg:
+                    continue
+                
+                refined_i, refined_j = SimpleFingerprintDetector.refine_position(
+                    poincare, i, j, search_type=search_type
+                )
+                
+                y = refined_i * step + block_size // 2
+                x = refined_j * step + block_size // 2
+                points.append({
+                    'x': int(x), 
+                    'y': int(y),
+                    'index': float(poincare[i, j]),
+                    'coherence': float(coherence[i, j]),
+                    'avg_coherence': float(avg_coherence)
+                })
+        
+        return deltas, cores
+    
+    @staticmethod
+    def remove_duplicates(points, min_distance=50):
+        if len(points) == 0:
+            return []
+        
+        if points and 'index' in points[0] and 'coherence' in points[0]:
+            points_sorted = sorted(points, 
+                                  key=lambda p: abs(p['index']) * p['coherence'], 
+                                  reverse=True)
+        elif points and 'coherence' in points[0]:
+            points_sorted = sorted(points, 
+                                  key=lambda p: p['coherence'], 
+                                  reverse=True)
+        else:
+            points_sorted = points
+        
+        return suppress_nearby_points(points_sorted, min_distance)
+    
+    def find_candidate_regions(self, block_size=16, min_coherence=0.5, scale=2,
+                               coarse_block_size=None, window_blocks=12, stride=None,
+                               min_index=0.25):
+        """
+        Passada grosseira: estima o campo de orientação numa versão reduzida da
+        imagem e devolve as janelas (em pixels da imagem original, alinhadas à
+        grade de blocos) que contêm possíveis pontos singulares.
+        """
+        coarse_block_size = coarse_block_size or max(4, block_size // scale)
+        coarse = cv2.resize(
+            self.image,
+            (max(1, self.width // scale), max(1, self.height // scale)),
+            interpolation=cv2.INTER_AREA,
+        )
+        coarse_detector = SimpleFingerprintDetector(coarse)
+        coarse_detector.compute_gradients()
+        orientation, coherence, _ = coarse_detector.compute_orientation_field(coarse_block_size)
+        orientation = coarse_detector.smooth_orientation(orientation)
+        poincare = coarse_detector.compute_poincare_index(orientation, coherence, min_coherence)
+        
+        step = stride or block_size
+        blocks_h = (self.height - block_size) // step + 1
+        blocks_w = (self.width - block_size) // step + 1
+        
+        # Leva os blocos grosseiros candidatos para a grade de blocos da
+        # imagem original e dilata cada um numa janela; janelas sobrepostas se unem
+        coarse_step = coarse_block_size * scale
+        ci, cj = np.nonzero(np.abs(poincare) >= min_index)
+        wanted = np.zeros((blocks_h, blocks_w), dtype=bool)
+        wanted[
+            np.minimum((ci * coarse_step + coarse_step // 2) // step, blocks_h - 1),
+            np.minimum((cj * coarse_step + coarse_step // 2) // step, blocks_w - 1),
+        ] = True
+        wanted = ndimage.maximum_filter(wanted, size=2 * window_blocks + 1, mode="constant")
+        
+        labels, _ = ndimage.label(wanted)
+        regions = []
+        for rows, cols in ndimage.find_objects(labels):
+            y0, x0 = rows.start * step, cols.start * step
+            y1 = min(self.height, (rows.stop - 1) * step + block_size)
+            x1 = min(self.width, (cols.stop - 1) * step + block_size)
+            regions.append((y0, y1, x0, x1))
+        
+        return regions, wanted.mean() if wanted.size else 0.0
+    
+    def detect_pyramid(self, block_size=16, min_coherence=0.5, stride=None, params=None,
+                       scale=2, coarse_block_size=None, window_blocks=12, max_coverage=0.6):
+        """
+        Detecção grosso-para-fino: a passada reduzida localiza as regiões
+        candidatas e só elas são processadas na resolução original. Se a
+        imagem for pequena demais ou as regiões cobrirem a maior parte dela,
+        cai na detecção completa.
+        """
+        coarse_block_size = coarse_block_size or max(4, block_size // scale)
+        coarse_blocks = min(self.height, self.width) // scale // coarse_block_size
+        if scale <= 1 or coarse_blocks < 8:
+            return self.detect(block_size, min_coherence, stride, params)
+        
+        regions, coverage = self.find_candidate_regions(
+            block_size, min_coherence, scale, coarse_block_size, window_blocks, stride
+        )
+        if coverage > max_coverage:
+            return self.detect(block_size, min_coherence, stride, params)
+        
+        deltas = []
+        cores = []
+        for y0, y1, x0, x1 in regions:
+            window = SimpleFingerprintDetector(self.image[y0:y1, x0:x1])
+            window.compute_gradients()
+            orientation, coherence, bs = window.compute_orientation_field(block_size, stride)
+            orientation = window.smooth_orientation(orientation)
+            poincare = window.compute_poincare_index(orientation, coherence, min_coherence)
+            window_deltas, window_cores = window.find_singular_points(
+                poincare, coherence, bs, stride, params
+            )
+            
+            for point in window_deltas + window_cores:
+                point['x'] += x0
+                point['y'] += y0
+            deltas.extend(window_deltas)
+            cores.extend(window_cores)
+        
+        deltas = self.remove_duplicates(deltas, min_distance=50)
+        cores = self.remove_duplicates(cores, min_distance=50)
+        
+        return deltas, cores
+    
+    def compute_fields(self, block_size=16, stride=None):
+        """
+        Calcula os campos intermediários, que dependem só da imagem e da grade
+        de blocos: orientação suavizada, coerência e índice de Poincaré sem a
+        máscara de coerência mínima.
+        """
+        self.compute_gradients()
+        orientation, coherence, _ = self.compute_orientation_field(block_size, stride)
+        orientation = self.smooth_orientation(orientation)
+        poincare = self.compute_poincare_index(orientation, coherence, min_coherence=-np.inf)
+        
+        return orientation, coherence, poincare
+    
+    @classmethod
+    def detect_from_fields(cls, poincare, coherence, block_size=16, min_coherence=0.5,
+                           stride=None, params=None):
+        """Etapa final da detecção, a partir de campos já calculados (ou em cache)."""
+        poincare = np.asarray(poincare, dtype=np.float64)
+        coherence = np.asarray(coherence, dtype=np.float64)
+        
+        poincare = mask_poincare(poincare, coherence, min_coherence)
+        deltas, cores = cls.find_singular_points(poincare, coherence, block_size, stride, params)
+        deltas = cls.remove_duplicates(deltas, min_distance=50)
+        cores = cls.remove_duplicates(cores, min_distance=50)
+        
+        return deltas, cores
+    
+    def detect(self, block_size=16, min_coherence=0.5, stride=None, params=None):
+        _, coherence, poincare = self.compute_fields(block_size, stride)
+        
+        return self.detect_from_fields(
+            poincare, coherence, block_size, min_coherence, stride, params
+        )
+
+
+def decode_binary_image(image_bytes: bytes) -> np.ndarray:
+    """Decodifica bytes de imagem para array numpy (escala de cinza, somente leitura)."""
+    try:
+        return ImageHandle(image_bytes).array
+    except Exception as e:
+        raise ValueError(f"Erro ao processar imagem: {str(e)}")
+
+
+def compute_image_fields(image: ImageHandle | bytes, block_size: int = 16, stride=None):
+    """Campos intermediários compactos a partir da imagem."""
+    detector = SimpleFingerprintDetector(as_image_handle(image).array)
+    return compact_fields(*detector.compute_fields(block_size, stride))
+
+
+def sweep_fields(poincare, coherence, block_size: int, stride, min_coherences, params_list):
+    """
+    Avalia cada combinação de min_coherence x params sobre os mesmos campos.
+
+    Returns:
+        list: Tuplas (min_coherence, params, deltas, cores), na ordem da grade
+    """
+    results = []
+    for min_coherence in min_coherences:
+        for params in params_list:
+            deltas, cores = SimpleFingerprintDetector.detect_from_fields(
+                poincare, coherence, block_size, min_coherence, stride, params
+            )
+            results.append((min_coherence, params, deltas, cores))
+    return results
+
+
+def detect_image(image: ImageHandle | bytes, block_size: int = 16, min_coherence: float = 0.5,
+                 stride=None, params=None, pyramid: bool = False):
+    """
+    Detecção completa a partir da imagem, no formato usado pelo endpoint.
+    Função de módulo para poder rodar em processos separados; com um
+    ImageHandle, a imagem já decodificada no worker não é decodificada de novo.
+
+    Returns:
+        tuple: (deltas, cores, fields); fields são os campos intermediários
+        compactos, ou None no modo pirâmide
+    """
+    detector = SimpleFingerprintDetector(as_image_handle(image).array)
+    
+    if pyramid:
+        deltas, cores = detector.detect_pyramid(block_size, min_coherence, stride, params)
+        fields = None
+    else:
+        fields = compact_fields(*detector.compute_fields(block_size, stride))
+        deltas, cores = SimpleFingerprintDetector.detect_from_fields(
+            fields[2], fields[1], block_size, min_coherence, stride, params
+        )
+    
+    deltas = [{'x': p['x'], 'y': p['y']} for p in deltas]
+    cores = [{'x': p['x'], 'y': p['y']} for p in cores]
+    
+    return deltas, cores, fields
@@ -0,0 +1,94 @@
+import os
+from typing import Optional
+import cv2
+import numpy as np
+
+# Formatos de armazenamento das imagens derivadas, todos sem perdas:
+# - png: PNG com IMAGE_PNG_COMPRESSION
+# - webp: WebP sem perdas
+# - binary: PNG de 1 bit por pixel para imagens só com 0 e 255 (as realçadas);
+#   outras imagens caem no png
+STORAGE_FORMATS = ("png", "webp", "binary")
+
+# Nível de compressão do zlib (0-9): mais alto é menor e mais lento para gravar
+IMAGE_PNG_COMPRESSION = int(os.getenv("IMAGE_PNG_COMPRESSION", "6"))
+
+# Formato padrão de cada imagem derivada; IMAGE_<NOME>_FORMAT substitui
+DEFAULT_STORAGE_FORMATS = {
+    "image_filtered": "binary",
+    "image_normalized": "png",
+    "image_processed": "png",
+}
+
+
+def validate_storage_format(storage_format: str) -> str:
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError(
+            f"Formato de armazenamento desconhecido: {storage_format} (disponíveis: {', '.join(STORAGE_FORMATS)})"
+        )
+    return storage_format
+
+
+def get_storage_format(name: str) -> str:
+    """Formato de `name` (ex.: 'image_filtered'), de IMAGE_FILTERED_FORMAT ou do padrão."""
+    return validate_storage_format(os.getenv(f"{name.upper()}_FORMAT", DEFAULT_STORAGE_FORMATS[name]))
+
+
+def is_binary(array: np.ndarray) -> bool:
+    """Imagem de um canal só com pixels 0 e 255."""
+    if array.ndim != 2 or array.dtype != np.uint8:
+        return False
+    return not np.any((array != 0) & (array != 255))
+
+
+def encode_array(array: np.ndarray, storage_format: str = "png") -> bytes:
+    """
+    Codifica um array do OpenCV (escala de cinza ou cores) no formato de
+    armazenamento. Decodificar o resultado devolve os mesmos pixels.
+    """
+    validate_storage_format(storage_format)
+    # WebP só tem 8 bits por canal; 16 bits ficam em PNG
+    webp = array.dtype == np.uint8 and (array.ndim == 2 or array.shape[-1] in (3, 4))
+    if storage_format == "webp" and webp:
+        # Qualidade acima de 100: WebP sem perdas
+        success, encoded = cv2.imencode(".webp", array, [cv2.IMWRITE_WEBP_QUALITY, 101])
+    else:
+        params = [cv2.IMWRITE_PNG_COMPRESSION, IMAGE_PNG_COMPRESSION]
+        if storage_format == "binary" and is_binary(array):
+            params += [cv2.IMWRITE_PNG_BILEVEL, 1]
+        success, encoded = cv2.imencode(".png", array, params)
+
+    if not success:
+        raise ValueError(f"Erro ao codificar a imagem em {storage_format}")
+    return encoded.tobytes()
+
+
+def compact_image(data: bytes, storage_format: str) -> Optional[bytes]:
+    """
+    Regrava uma imagem já codificada no formato de armazenamento.
+
+    Returns:
+        bytes | None: A nova codificação, só quando ela é menor e decodifica
+        exatamente nos mesmos pixels; None para manter `data` (não é uma
+        imagem, não ficou menor ou o formato perderia informação, como 16 bits
+        em WebP)
+    """
+    original = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+    if original is None:
+        return None
+
+    try:
+        encoded = encode_array(original, storage_format)
+    except (ValueError, cv2.error):
+        return None
+    if len(encoded) >= len(data):
+        return None
+
+    # WebP em escala de cinza é gravado com três canais iguais
+    flags = cv2.IMREAD_GRAYSCALE | cv2.IMREAD_ANYDEPTH if original.ndim == 2 else cv2.IMREAD_UNCHANGED
+    decoded = cv2.imdecode(np.frombuffer(encoded, np.uint8), flags)
+    if decoded is None or decoded.shape != original.shape or decoded.dtype != original.dtype:
+        return None
+    if not np.array_equal(decoded, original):
+        return None
+    return encoded
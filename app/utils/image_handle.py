@@ -0,0 +1,93 @@
+import os
+from typing import Optional, Union
+import cv2
+import numpy as np
+from app.utils.image_format import encode_array
+from app.utils.image_hash import sha256_hex
+from app.utils.image_store import get_image_store
+from app.utils.lru_cache import LRUCache
+
+# Imagens decodificadas recentes, por processo (cada worker do pool tem o seu)
+_decoded = LRUCache(int(os.getenv("DECODED_IMAGE_CACHE_SIZE", "32")))
+
+
+class ImageHandle:
+    """
+    Uma imagem que passa pelo realce e pela detecção: bytes, sha256 e o
+    array em escala de cinza, decodificado no máximo uma vez.
+
+    O array decodificado fica no cache do processo, pela chave do hash:
+    detecções repetidas da mesma imagem no mesmo worker não decodificam de
+    novo. Sem `data`, os bytes são lidos do armazenamento de imagens só se o
+    array não estiver no cache.
+
+    Ao ir para outro processo (pool de processamento) só bytes e hash são
+    enviados; o array é refeito, ou achado no cache, do outro lado.
+    """
+
+    def __init__(self, data: Optional[bytes] = None, image_hash: Optional[str] = None,
+                 array: Optional[np.ndarray] = None):
+        if data is None and image_hash is None:
+            raise ValueError("ImageHandle precisa dos bytes ou do hash da imagem")
+        self._data = data
+        self._hash = image_hash
+        self._array = array
+        if array is not None:
+            self._remember(array)
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            self._data = get_image_store().get(self._hash)
+            if self._data is None:
+                raise ValueError(f"Imagem {self._hash} não encontrada no armazenamento")
+        return self._data
+
+    @property
+    def hash(self) -> str:
+        if self._hash is None:
+            self._hash = sha256_hex(self._data)
+        return self._hash
+
+    @property
+    def array(self) -> np.ndarray:
+        """Imagem em escala de cinza (uint8, somente leitura)."""
+        if self._array is None:
+            cached = _decoded.get(self.hash)
+            if cached is None:
+                cached = cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_GRAYSCALE)
+                if cached is None:
+                    raise ValueError("Falha ao decodificar a imagem")
+                self._remember(cached)
+            self._array = cached
+        return self._array
+
+    @property
+    def height(self) -> int:
+        return self.array.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.array.shape[1]
+
+    def _remember(self, array: np.ndarray) -> None:
+        # Compartilhado entre handles da mesma imagem: ninguém altera
+        array.flags.writeable = False
+        _decoded.put(self.hash, array)
+
+    def __getstate__(self) -> dict:
+        return {"_data": self._data, "_hash": self._hash, "_array": None}
+
+
+def as_image_handle(image: Union[ImageHandle, bytes]) -> ImageHandle:
+    """Aceita bytes nas funções que antes recebiam só os bytes da imagem."""
+    return image if isinstance(image, ImageHandle) else ImageHandle(image)
+
+
+def encode_image(array: np.ndarray, storage_format: str = "png") -> ImageHandle:
+    """
+    Imagem de um array já em memória (ex.: imagem realçada) no formato de
+    armazenamento (app.utils.image_format), com o array no cache: a detecção
+    logo em seguida no mesmo worker não decodifica a imagem gravada.
+    """
+    return ImageHandle(encode_array(array, storage_format), array=array)
@@ -0,0 +1,7 @@
+import hashlib
+from typing import Optional
+
+def sha256_hex(data: Optional[bytes]) -> Optional[str]:
+    if data is None:
+        return None
+    return hashlib.sha256(data).hexdigest()
@@ -0,0 +1,106 @@
+import re
+from typing import Optional
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara o If-None-Match (lista de ETags ou '*') com a ETag atual."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Comparação fraca, como manda a RFC 9110 para If-None-Match
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def parse_range(range_header: Optional[str], size: int):
+    """
+    Interpreta um cabeçalho Range com um único intervalo de bytes.
+
+    Returns:
+        tuple | None | bool: (start, end) inclusivos; None quando o cabeçalho
+        não existe ou não é suportado (responde a imagem inteira); False quando
+        o intervalo está fora do arquivo (416)
+    """
+    if not range_header:
+        return None
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        # Múltiplos intervalos ou outra unidade: ignora e manda tudo
+        return None
+
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        # Sufixo: os últimos N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def image_response(request: Request, buffer, image_hash: str, media_type: str) -> Response:
+    """
+    Responde os bytes de uma imagem com ETag forte (o hash do conteúdo),
+    304 para If-None-Match e suporte a Range/If-Range.
+
+    Args:
+        buffer: bytes ou objeto fatiável (ex.: mmap); fechado ao fim do envio
+            se tiver `close()`
+    """
+    etag = f'"{image_hash}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # A URL é fixa mas o conteúdo muda se a imagem for trocada: revalida sempre
+        "Cache-Control": "no-cache",
+    }
+    close = getattr(buffer, "close", None)
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        if close:
+            close()
+        return Response(status_code=304, headers=headers)
+
+    size = len(buffer)
+    byte_range = parse_range(request.headers.get("range"), size)
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        byte_range = None
+
+    if byte_range is False:
+        if close:
+            close()
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    def chunks():
+        try:
+            for offset in range(start, end + 1, CHUNK_SIZE):
+                yield bytes(buffer[offset:min(offset + CHUNK_SIZE, end + 1)])
+        finally:
+            if close:
+                close()
+
+    return StreamingResponse(chunks(), status_code=status_code, media_type=media_type, headers=headers)
@@ -0,0 +1,150 @@
+import mmap
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Optional
+from PIL import Image
+from app.utils.image_hash import sha256_hex
+
+
+class ImageStore(ABC):
+    """Armazenamento de imagens endereçado pelo sha256 do conteúdo."""
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """Grava `data` e devolve o hash; gravar o mesmo conteúdo de novo não faz nada."""
+
+    @abstractmethod
+    def get(self, image_hash: str) -> Optional[bytes]:
+        """Devolve o conteúdo, ou None se o hash não está no armazenamento."""
+
+    def open(self, image_hash: str):
+        """
+        Conteúdo como buffer fatiável (len e slices). Por padrão lê tudo com
+        `get`; backends que conseguem ler por partes devolvem um objeto com
+        `close()`, que o chamador deve fechar.
+        """
+        return self.get(image_hash)
+
+    @abstractmethod
+    def exists(self, image_hash: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, image_hash: str) -> None:
+        ...
+
+
+class LocalImageStore(ImageStore):
+    """
+    Diretório local com um arquivo por conteúdo, em subpastas pelos primeiros
+    caracteres do hash (ab/cd/abcd...) para não acumular milhares de arquivos
+    numa pasta só.
+
+    A escrita vai para um arquivo temporário na mesma pasta e é renomeada no
+    fim, então um leitor nunca vê um arquivo pela metade. Como o nome é o
+    hash, arquivos gravados por uma transação que depois falhou só ocupam
+    espaço; nunca ficam com conteúdo errado.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, image_hash: str) -> str:
+        return os.path.join(self.root, image_hash[:2], image_hash[2:4], image_hash)
+
+    def put(self, data: bytes) -> str:
+        image_hash = sha256_hex(data)
+        path = self.path(image_hash)
+        if os.path.exists(path):
+            return image_hash
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return image_hash
+
+    def open(self, image_hash: str):
+        """
+        Mapeia o arquivo em memória (somente leitura). Leituras parciais não
+        copiam o arquivo inteiro; o chamador deve fechar o mapa.
+
+        Returns:
+            mmap.mmap | None: None se o hash não está no armazenamento
+        """
+        try:
+            with open(self.path(image_hash), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+    def get(self, image_hash: str) -> Optional[bytes]:
+        mapped = self.open(image_hash)
+        if mapped is None:
+            return b"" if self.exists(image_hash) else None
+        with mapped:
+            return mapped[:]
+
+    def exists(self, image_hash: str) -> bool:
+        return os.path.exists(self.path(image_hash))
+
+    def delete(self, image_hash: str) -> None:
+        try:
+            os.remove(self.path(image_hash))
+        except FileNotFoundError:
+            pass
+
+
+IMAGE_STORE_BACKENDS = {
+    "local": lambda: LocalImageStore(os.getenv("IMAGE_STORE_PATH", "data/images")),
+}
+
+_store: Optional[ImageStore] = None
+
+
+def get_image_store() -> ImageStore:
+    global _store
+    if _store is None:
+        backend = os.getenv("IMAGE_STORE_BACKEND", "local")
+        if backend not in IMAGE_STORE_BACKENDS:
+            raise ValueError(f"IMAGE_STORE_BACKEND desconhecido: {backend}")
+        _store = IMAGE_STORE_BACKENDS[backend]()
+    return _store
+
+
+def image_media_type(fmt: Optional[str]) -> str:
+    """Content-type do formato gravado em `<imagem>_format` (ex.: 'png' -> 'image/png')."""
+    if not fmt:
+        return "application/octet-stream"
+    Image.init()
+    return Image.MIME.get(fmt.upper(), "application/octet-stream")
+
+
+def describe_image(data: bytes) -> tuple[Optional[str], Optional[int], Optional[int]]:
+    """
+    Lê formato e dimensões do cabeçalho da imagem, sem decodificar os pixels.
+
+    Returns:
+        tuple: (format, width, height); None nos campos que não puderam ser lidos
+    """
+    try:
+        with Image.open(BytesIO(data)) as img:
+            width, height = img.size
+            return (img.format or "").lower() or None, width, height
+    except Exception:
+        return None, None, None
@@ -0,0 +1,169 @@
+import os
+from typing import NamedTuple, Optional, Union
+import cv2
+import numpy as np
+from app.utils.image_format import get_storage_format
+from app.utils.image_handle import ImageHandle, as_image_handle, encode_image
+from app.utils.process_images import EnhancementResult, enhance_image
+
+# Com "false" a digital é processada no tamanho enviado, sem recorte
+INGEST_NORMALIZE = os.getenv("INGEST_NORMALIZE", "true").lower() == "true"
+
+# Lado maior máximo (px) da digital recortada: recortes maiores são reduzidos,
+# menores mantêm a escala; 0 nunca reamostra
+INGEST_TARGET_SIZE = int(os.getenv("INGEST_TARGET_SIZE", "512"))
+
+# Borda (px da imagem original) mantida em volta da região da digital
+INGEST_CROP_MARGIN = int(os.getenv("INGEST_CROP_MARGIN", "16"))
+
+# Blocos com desvio padrão abaixo de FOREGROUND_STD_RATIO do percentil 95
+# (ou de FOREGROUND_MIN_STD níveis de cinza) são fundo
+FOREGROUND_BLOCK = 16
+FOREGROUND_STD_RATIO = 0.3
+FOREGROUND_MIN_STD = 5.0
+
+
+class IngestTransform(NamedTuple):
+    """
+    Recorte (x, y, width, height, em px da imagem original) e escala
+    (px normalizados por px original) aplicados na ingestão.
+    """
+
+    x: int
+    y: int
+    width: int
+    height: int
+    scale: float
+
+    def to_original(self, x: float, y: float) -> tuple[int, int]:
+        """Ponto da imagem normalizada → ponto da imagem original."""
+        return round(x / self.scale + self.x), round(y / self.scale + self.y)
+
+    def to_normalized(self, x: float, y: float) -> tuple[int, int]:
+        """Ponto da imagem original → ponto da imagem normalizada."""
+        return round((x - self.x) * self.scale), round((y - self.y) * self.scale)
+
+
+class NormalizedImage(NamedTuple):
+    image: bytes
+    transform: IngestTransform
+
+
+class IngestResult(NamedTuple):
+    normalized: Optional[NormalizedImage]
+    enhanced: Optional[EnhancementResult]
+
+
+def foreground_box(img: np.ndarray, margin: int = INGEST_CROP_MARGIN) -> tuple[int, int, int, int]:
+    """
+    Retângulo (x, y, width, height) da digital: o maior componente conexo dos
+    blocos com textura de cristas, com `margin` pixels de borda. Sem nenhum
+    bloco assim, a imagem inteira.
+    """
+    h, w = img.shape
+    blocks_h, blocks_w = h // FOREGROUND_BLOCK, w // FOREGROUND_BLOCK
+    if blocks_h < 2 or blocks_w < 2:
+        return 0, 0, w, h
+
+    # Desvio padrão por bloco, com média e média dos quadrados por área
+    pixels = img[:blocks_h * FOREGROUND_BLOCK, :blocks_w * FOREGROUND_BLOCK].astype(np.float32)
+    mean = cv2.resize(pixels, (blocks_w, blocks_h), interpolation=cv2.INTER_AREA)
+    mean_sq = cv2.resize(pixels * pixels, (blocks_w, blocks_h), interpolation=cv2.INTER_AREA)
+    std = np.sqrt(np.maximum(mean_sq - mean * mean, 0))
+
+    threshold = max(FOREGROUND_STD_RATIO * np.percentile(std, 95), FOREGROUND_MIN_STD)
+    mask = (std > threshold).astype(np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if count < 2:
+        return 0, 0, w, h
+    # Componente 0 é o fundo
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    bx, by, bw, bh = (int(v) * FOREGROUND_BLOCK for v in stats[largest, :4])
+
+    x0, y0 = max(bx - margin, 0), max(by - margin, 0)
+    x1, y1 = min(bx + bw + margin, w), min(by + bh + margin, h)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def normalize_array(img: np.ndarray, target_size: int = INGEST_TARGET_SIZE) -> tuple[np.ndarray, IngestTransform]:
+    """
+    Recorta a digital e reduz o recorte para no máximo `target_size` no lado
+    maior. Recortes menores não são ampliados: só aumentariam o custo do
+    processamento.
+    """
+    x, y, width, height = foreground_box(img)
+    cropped = img[y:y + height, x:x + width]
+
+    scale = min(1.0, target_size / max(width, height)) if target_size > 0 else 1.0
+    if scale < 1.0:
+        size = (max(round(width * scale), 1), max(round(height * scale), 1))
+        cropped = cv2.resize(cropped, size, interpolation=cv2.INTER_AREA)
+
+    return np.ascontiguousarray(cropped), IngestTransform(x, y, width, height, scale)
+
+
+def normalize_image(image: Union[ImageHandle, bytes]) -> NormalizedImage:
+    """
+    Versão normalizada de uma digital enviada (em escala de cinza, no formato
+    IMAGE_NORMALIZED_FORMAT), usada em todo o processamento no lugar da original.
+
+    Raises:
+        ValueError: Imagem que não pode ser decodificada
+    """
+    normalized, transform = normalize_array(as_image_handle(image).array)
+    return NormalizedImage(encode_image(normalized, get_storage_format("image_normalized")).data, transform)
+
+
+def ingest_image(image: Union[ImageHandle, bytes], backend: Optional[str] = None,
+                 enhance: bool = True) -> IngestResult:
+    """
+    Normalização e, com `enhance`, realce de uma digital recém-enviada, no
+    mesmo processo: o realce parte do array normalizado já em memória.
+
+    Imagens que não podem ser decodificadas (ou INGEST_NORMALIZE=false)
+    seguem sem versão normalizada; o realce então usa a original.
+    """
+    image = as_image_handle(image)
+    normalized = None
+    if INGEST_NORMALIZE:
+        try:
+            normalized = normalize_image(image)
+        except ValueError as e:
+            print(f"Erro na normalização: {e}")
+
+    enhanced = None
+    if enhance:
+        source = ImageHandle(normalized.image) if normalized is not None else image
+        enhanced = enhance_image(source, backend)
+    return IngestResult(normalized, enhanced)
+
+
+def apply_ingest_transform(fingerprint, transform: Optional[IngestTransform]) -> None:
+    """Grava a transformação nas colunas `ingest_*` da digital (ou limpa as colunas)."""
+    fingerprint.ingest_crop_x = transform.x if transform else None
+    fingerprint.ingest_crop_y = transform.y if transform else None
+    fingerprint.ingest_crop_width = transform.width if transform else None
+    fingerprint.ingest_crop_height = transform.height if transform else None
+    fingerprint.ingest_scale = transform.scale if transform else None
+
+
+def get_ingest_transform(fingerprint) -> Optional[IngestTransform]:
+    """Transformação gravada na digital, ou None se ela não foi normalizada."""
+    if fingerprint.ingest_scale is None:
+        return None
+    return IngestTransform(
+        fingerprint.ingest_crop_x,
+        fingerprint.ingest_crop_y,
+        fingerprint.ingest_crop_width,
+        fingerprint.ingest_crop_height,
+        fingerprint.ingest_scale,
+    )
+
+
+def apply_ingest(fingerprint, normalized: Optional[NormalizedImage]) -> None:
+    """Grava na digital a imagem normalizada e a transformação (ou limpa as duas)."""
+    fingerprint.image_normalized = normalized.image if normalized is not None else None
+    apply_ingest_transform(fingerprint, normalized.transform if normalized is not None else None)
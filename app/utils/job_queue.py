@@ -0,0 +1,159 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import or_, and_, insert
+from sqlalchemy.orm import Session
+from app.constants.enum import JobStatus
+from app.models.processing_job import ProcessingJob
+
+JOB_KIND_ENHANCE = "enhance"
+
+
+def get_max_attempts() -> int:
+    return int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+
+
+def get_backoff_seconds() -> float:
+    return float(os.getenv("JOB_BACKOFF_SECONDS", "10"))
+
+
+def get_max_backoff_seconds() -> float:
+    return float(os.getenv("JOB_MAX_BACKOFF_SECONDS", "3600"))
+
+
+def get_lock_timeout() -> float:
+    return float(os.getenv("JOB_LOCK_TIMEOUT", "600"))
+
+
+def enqueue_job(db: Session, fingerprint_id: int, kind: str = JOB_KIND_ENHANCE,
+                backend: Optional[str] = None) -> ProcessingJob:
+    """
+    Adiciona um job à fila na sessão atual. Não faz commit: gravado na mesma
+    transação da digital, o job nunca fica sem a imagem nem a imagem sem o job.
+    """
+    job = ProcessingJob(
+        fingerprint_id=fingerprint_id,
+        kind=kind,
+        backend=backend,
+        status=JobStatus.pending,
+        attempts=0,
+        max_attempts=get_max_attempts(),
+        run_after=datetime.utcnow(),
+    )
+    db.add(job)
+    return job
+
+
+def enqueue_jobs(db: Session, fingerprint_ids: list[int], kind: str = JOB_KIND_ENHANCE,
+                 backend: Optional[str] = None) -> None:
+    """Enfileira jobs para várias digitais num único INSERT em lote; também sem commit."""
+    if not fingerprint_ids:
+        return
+    now = datetime.utcnow()
+    max_attempts = get_max_attempts()
+    db.execute(insert(ProcessingJob), [
+        {
+            "fingerprint_id": fingerprint_id,
+            "kind": kind,
+            "backend": backend,
+            "status": JobStatus.pending,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_after": now,
+        }
+        for fingerprint_id in fingerprint_ids
+    ])
+
+
+def claim_job(db: Session, worker_id: str) -> Optional[ProcessingJob]:
+    """
+    Reserva o próximo job disponível para este worker.
+
+    `FOR UPDATE SKIP LOCKED` faz cada worker pular as linhas já travadas por
+    outro, então vários workers podem consultar a fila ao mesmo tempo sem
+    pegar o mesmo job. Jobs em `running` cuja trava passou de JOB_LOCK_TIMEOUT
+    (worker que morreu no meio) voltam a ser elegíveis.
+
+    Returns:
+        ProcessingJob | None: job já marcado como `running`, ou None se a fila está vazia
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=get_lock_timeout())
+
+    job = (
+        db.query(ProcessingJob)
+        .filter(
+            or_(
+                and_(ProcessingJob.status == JobStatus.pending, ProcessingJob.run_after <= now),
+                and_(ProcessingJob.status == JobStatus.running, ProcessingJob.locked_at < stale),
+            )
+        )
+        .order_by(ProcessingJob.run_after, ProcessingJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.rollback()
+        return None
+
+    job.status = JobStatus.running
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.locked_at = now
+    db.commit()
+    return job
+
+
+def release_job(db: Session, job: ProcessingJob, worker_id: str, values: dict) -> bool:
+    """
+    Grava o fim do job (`values` mais a liberação da trava) e faz commit, só se
+    ele ainda está reservado para `worker_id`. Um job retomado por outro worker
+    depois de JOB_LOCK_TIMEOUT não termina duas vezes: sem a reserva, a
+    transação inteira é desfeita, inclusive o que o handler gravou nela.
+
+    Returns:
+        bool: False se o job não era mais deste worker
+    """
+    released = (
+        db.query(ProcessingJob)
+        .filter(
+            ProcessingJob.id == job.id,
+            ProcessingJob.status == JobStatus.running,
+            ProcessingJob.locked_by == worker_id,
+        )
+        .update({**values, "locked_by": None, "locked_at": None}, synchronize_session=False)
+    )
+    if not released:
+        db.rollback()
+        return False
+    db.commit()
+    return True
+
+
+def complete_job(db: Session, job: ProcessingJob, worker_id: str) -> bool:
+    return release_job(db, job, worker_id, {"status": JobStatus.done, "last_error": None})
+
+
+def backoff_delay(attempts: int) -> float:
+    """Espera exponencial antes da próxima tentativa: base, 2x base, 4x base... até o limite."""
+    return min(get_backoff_seconds() * 2 ** (attempts - 1), get_max_backoff_seconds())
+
+
+def fail_job(db: Session, job: ProcessingJob, worker_id: str, error: str) -> bool:
+    """Devolve o job à fila com backoff, ou marca como `failed` ao esgotar as tentativas."""
+    values = {"last_error": error}
+    if job.attempts >= job.max_attempts:
+        values["status"] = JobStatus.failed
+    else:
+        values["status"] = JobStatus.pending
+        values["run_after"] = datetime.utcnow() + timedelta(seconds=backoff_delay(job.attempts))
+    return release_job(db, job, worker_id, values)
+
+
+def get_latest_job(db: Session, fingerprint_id: int, kind: str = JOB_KIND_ENHANCE) -> Optional[ProcessingJob]:
+    return (
+        db.query(ProcessingJob)
+        .filter(ProcessingJob.fingerprint_id == fingerprint_id, ProcessingJob.kind == kind)
+        .order_by(ProcessingJob.id.desc())
+        .first()
+    )
@@ -0,0 +1,125 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def block_sums(values: np.ndarray, block_size: int, stride: int | None = None) -> np.ndarray:
+    """
+    Soma `values` em janelas block_size x block_size, deslocadas de `stride` pixels.
+
+    Cada linha da janela é reduzida ao longo do eixo contíguo e as linhas são
+    acumuladas em ordem, a mesma sequência de somas que `np.sum` faz sobre uma
+    fatia 2D. Com stride == block_size (blocos sem sobreposição) o resultado é
+    idêntico, bit a bit, ao laço por bloco.
+
+    Args:
+        values (np.ndarray): Matriz 2D a ser reduzida
+        block_size (int): Lado da janela em pixels
+        stride (int | None): Passo entre janelas (padrão: block_size)
+
+    Returns:
+        np.ndarray: Somas por janela, shape (blocos_h, blocos_w)
+    """
+    stride = stride or block_size
+    h, w = values.shape
+    blocks_h = (h - block_size) // stride + 1 if h >= block_size else 0
+    blocks_w = (w - block_size) // stride + 1 if w >= block_size else 0
+
+    if blocks_h == 0 or blocks_w == 0:
+        return np.zeros((blocks_h, blocks_w))
+
+    # Soma horizontal de cada linha de cada janela: (h, blocos_w)
+    row_sums = sliding_window_view(values, block_size, axis=1)[:, ::stride].sum(axis=-1)
+
+    # Acumulação vertical: um passo por linha do bloco, não por bloco
+    last = (blocks_h - 1) * stride + 1
+    sums = np.zeros((blocks_h, blocks_w))
+    for k in range(block_size):
+        sums += row_sums[k:k + last:stride]
+
+    return sums
+
+
+def block_orientation_field(gx: np.ndarray, gy: np.ndarray, block_size: int = 16, stride: int | None = None):
+    """
+    Calcula o campo de orientação e a coerência por bloco a partir dos gradientes.
+
+    Args:
+        gx (np.ndarray): Gradiente horizontal (Sobel)
+        gy (np.ndarray): Gradiente vertical (Sobel)
+        block_size (int): Lado do bloco em pixels
+        stride (int | None): Passo entre blocos; menor que block_size gera
+            blocos sobrepostos (padrão: block_size)
+
+    Returns:
+        tuple: (orientation, coherence), ambos com shape (blocos_h, blocos_w)
+    """
+    Gxx = block_sums(gx * gx, block_size, stride)
+    Gyy = block_sums(gy * gy, block_size, stride)
+    Gxy = block_sums(gx * gy, block_size, stride)
+
+    orientation = 0.5 * np.arctan2(2 * Gxy, Gxx - Gyy)
+    coherence = np.sqrt((Gxx - Gyy)**2 + 4*Gxy**2) / (Gxx + Gyy + 1e-10)
+
+    return orientation, coherence
+
+
+# Vizinhos (di, dj) percorridos em ordem no contorno fechado do índice de Poincaré
+POINCARE_NEIGHBORS = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+
+
+def wrap_orientation_difference(diff: np.ndarray) -> np.ndarray:
+    """
+    Reduz diferenças de orientação (módulo π) ao intervalo [-π/2, π/2].
+
+    As orientações estão em [-π/2, π/2], então a diferença fica em [-π, π] e
+    basta um único passo de ±π para trazê-la ao intervalo.
+    """
+    diff = np.where(diff > np.pi/2, diff - np.pi, diff)
+    return np.where(diff < -np.pi/2, diff + np.pi, diff)
+
+
+def poincare_index(orientation: np.ndarray, coherence: np.ndarray, min_coherence: float = 0.5) -> np.ndarray:
+    """
+    Calcula o índice de Poincaré de todo o campo de orientação de uma vez.
+
+    Os oito vizinhos de cada bloco são obtidos deslocando a matriz de orientação;
+    blocos da borda e blocos com coerência abaixo de `min_coherence` ficam com 0.
+
+    Args:
+        orientation (np.ndarray): Campo de orientação (radianos)
+        coherence (np.ndarray): Coerência por bloco
+        min_coherence (float): Coerência mínima para calcular o índice
+
+    Returns:
+        np.ndarray: Índice de Poincaré com o mesmo shape de `orientation`
+    """
+    h, w = orientation.shape
+    poincare = np.zeros((h, w))
+
+    if h < 3 or w < 3:
+        return poincare
+
+    neighbors = [
+        orientation[1 + di:h - 1 + di, 1 + dj:w - 1 + dj]
+        for di, dj in POINCARE_NEIGHBORS
+    ]
+
+    angle_sum = np.zeros((h - 2, w - 2))
+    for k in range(8):
+        angle_sum += wrap_orientation_difference(neighbors[(k + 1) % 8] - neighbors[k])
+
+    index = angle_sum / (2 * np.pi)
+    valid = ~(coherence[1:h - 1, 1:w - 1] < min_coherence)
+    poincare[1:h - 1, 1:w - 1] = np.where(valid, index, 0.0)
+
+    return poincare
+
+
+def mask_poincare(poincare: np.ndarray, coherence: np.ndarray, min_coherence: float) -> np.ndarray:
+    """
+    Zera o índice de Poincaré dos blocos com coerência abaixo de `min_coherence`.
+
+    Aplicado sobre `poincare_index(..., min_coherence=-np.inf)` dá o mesmo
+    resultado de calcular o índice já com a máscara.
+    """
+    return np.where(coherence < min_coherence, 0.0, poincare)
@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MAX_PAGE_SIZE = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Cursor opaco com a posição (created_at, id) do último item da página."""
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def filter_created_at(stmt: Select, model, created_from: Optional[datetime],
+                      created_to: Optional[datetime]) -> Select:
+    """Filtra o intervalo [created_from, created_to) de criação."""
+    if created_from is not None:
+        stmt = stmt.where(model.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(model.created_at < created_to)
+    return stmt
+
+
+async def paginate(db: AsyncSession, stmt: Select, model, response: Response,
+                   cursor: Optional[str] = None, limit: Optional[int] = None) -> list:
+    """
+    Ordena por (created_at, id), do mais recente para o mais antigo, e aplica
+    a paginação por cursor (keyset): a próxima página começa depois da posição
+    do cursor, então o custo não cresce com o número de páginas já lidas,
+    como aconteceria com OFFSET.
+
+    Sem `limit` devolve todos os itens, como antes da paginação. Quando há
+    mais itens, o cursor da próxima página vai no cabeçalho X-Next-Cursor.
+    """
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+
+    if cursor is not None:
+        created_at, id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(model.created_at, model.id) < tuple_(created_at, id))
+
+    if limit is None:
+        return list((await db.scalars(stmt)).all())
+
+    # Um item a mais só para saber se existe próxima página
+    items = list((await db.scalars(stmt.limit(limit + 1))).all())
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+
+    return items
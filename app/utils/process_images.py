@@ -1,51 +1,193 @@
-import fingerprint_enhancer
+import os
+from abc import ABC, abstractmethod
+from importlib.metadata import version, PackageNotFoundError
+from typing import NamedTuple, Optional, Union
 import cv2
 import numpy as np
+from fastapi import HTTPException
+from app.utils.contextual_enhancer import enhance_contextual
+from app.utils.image_format import get_storage_format
+from app.utils.image_handle import ImageHandle, as_image_handle, encode_image
 
-def process(image_bytes: bytes) -> bytes:
+
+class EnhancementResult(NamedTuple):
+    image: bytes
+    backend: str
+    version: str
+
+
+class EnhancementBackend(ABC):
+    """
+    Realce de uma digital em escala de cinza. `name` e `version` ficam
+    gravados na digital junto com a imagem realçada; mude a versão sempre que
+    o resultado do backend mudar.
     """
-    Processa uma imagem de digital usando a biblioteca fingerprint_enhancer.
-    
+
+    name: str
+    version: str
+
+    @abstractmethod
+    def enhance(self, img: np.ndarray) -> np.ndarray:
+        """Imagem uint8 em escala de cinza → imagem realçada uint8 (cristas em branco)."""
+
+
+class LibraryBackend(EnhancementBackend):
+    """fingerprint_enhancer (filtros de Gabor orientados por bloco): melhor qualidade, segundos por imagem."""
+
+    name = "fingerprint_enhancer"
+
+    @property
+    def version(self) -> str:
+        try:
+            return version("fingerprint_enhancer")
+        except PackageNotFoundError:
+            return "unknown"
+
+    def enhance(self, img: np.ndarray) -> np.ndarray:
+        import fingerprint_enhancer
+
+        # A biblioteca retorna valores no range [0,1]
+        return (fingerprint_enhancer.enhance_fingerprint(img) * 255).astype(np.uint8)
+
+
+class GaborBankBackend(EnhancementBackend):
+    """
+    CLAHE + banco fixo de filtros de Gabor + Otsu, o pipeline de teste.py.
+    Os kernels são calculados uma vez por processo e cada orientação é uma
+    única convolução do OpenCV; o resultado é a maior resposta entre elas.
+    Bem mais rápido que a biblioteca, ao custo de não seguir a orientação
+    local das cristas.
+    """
+
+    name = "gabor"
+    version = "1"
+
+    def __init__(self, orientations: int = 8, ksize: int = 31, sigma: float = 7.0,
+                 wavelength: float = 12.0, gamma: float = 0.5):
+        self.kernels = [
+            cv2.getGaborKernel((ksize, ksize), sigma, theta, wavelength, gamma, 0, ktype=cv2.CV_32F)
+            for theta in np.arange(orientations) * np.pi / orientations
+        ]
+        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+
+    def enhance(self, img: np.ndarray) -> np.ndarray:
+        # Cristas escuras viram claras: o kernel responde a linhas claras no centro
+        img = self.clahe.apply(cv2.GaussianBlur(255 - img, (5, 5), 0))
+
+        response = cv2.filter2D(img, cv2.CV_32F, self.kernels[0])
+        for kernel in self.kernels[1:]:
+            np.maximum(response, cv2.filter2D(img, cv2.CV_32F, kernel), out=response)
+
+        normalized = cv2.normalize(response, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+        _, binary = cv2.threshold(normalized, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return binary
+
+
+class ContextualBackend(EnhancementBackend):
+    """
+    Filtragem contextual no domínio da frequência (app.utils.contextual_enhancer):
+    orientação e período das cristas por bloco, como a biblioteca, mas com
+    FFT em lote e filtros memoizados. Dezenas de vezes mais rápido.
+    """
+
+    name = "contextual"
+    version = "1"
+
+    def enhance(self, img: np.ndarray) -> np.ndarray:
+        return enhance_contextual(img)
+
+
+class IdentityBackend(EnhancementBackend):
+    """Sem realce: só a imagem em escala de cinza, para ingestão rápida."""
+
+    name = "identity"
+    version = "1"
+
+    def enhance(self, img: np.ndarray) -> np.ndarray:
+        return img
+
+
+ENHANCEMENT_BACKENDS = {
+    LibraryBackend.name: LibraryBackend,
+    GaborBankBackend.name: GaborBankBackend,
+    ContextualBackend.name: ContextualBackend,
+    IdentityBackend.name: IdentityBackend,
+}
+
+# Instâncias por processo (os kernels de Gabor são calculados uma vez)
+_backends: dict = {}
+
+
+def get_default_backend_name() -> str:
+    return os.getenv("ENHANCEMENT_BACKEND", LibraryBackend.name)
+
+
+def validate_backend_name(name: Optional[str]) -> Optional[str]:
+    if name is not None and name not in ENHANCEMENT_BACKENDS:
+        raise ValueError(
+            f"Backend de realce desconhecido: {name} (disponíveis: {', '.join(ENHANCEMENT_BACKENDS)})"
+        )
+    return name
+
+
+def check_backend_name(name: Optional[str]) -> Optional[str]:
+    """validate_backend_name para valores vindos da API: nome desconhecido é um 400."""
+    try:
+        return validate_backend_name(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def get_enhancement_backend(name: Optional[str] = None) -> EnhancementBackend:
+    name = validate_backend_name(name or get_default_backend_name())
+    if name not in _backends:
+        _backends[name] = ENHANCEMENT_BACKENDS[name]()
+    return _backends[name]
+
+
+def enhance_image(image: Union[ImageHandle, bytes], backend: Optional[str] = None) -> EnhancementResult:
+    """
+    Realça uma imagem de digital com o backend pedido (ou ENHANCEMENT_BACKEND).
+
+    A imagem é decodificada uma única vez (ou vem do cache do processo), e o
+    array realçado fica no cache pelo hash da imagem gerada: uma detecção logo
+    depois, no mesmo worker, não decodifica nenhuma das duas. A imagem sai no
+    formato IMAGE_FILTERED_FORMAT (por padrão PNG de 1 bit).
+
     Args:
-        image_bytes (bytes): Bytes da imagem de entrada
-        
+        image (ImageHandle | bytes): Imagem de entrada
+        backend (str | None): Nome em ENHANCEMENT_BACKENDS
+
     Returns:
-        bytes: Bytes da imagem processada em formato PNG
+        EnhancementResult: Imagem realçada e o backend/versão que a produziu
     """
+    image = as_image_handle(image)
+    storage_format = get_storage_format("image_filtered")
+    enhancer = get_enhancement_backend(backend)
+    identity = get_enhancement_backend(IdentityBackend.name)
+
+    # 1. Imagem em escala de cinza; sem ela só resta devolver os bytes originais
+    try:
+        img = image.array
+    except ValueError as e:
+        print(f"Erro no processamento: {e}")
+        return EnhancementResult(image.data, identity.name, identity.version)
+
     try:
-        # 1. Converter bytes → imagem em escala de cinza
-        np_arr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            raise ValueError("Não foi possível decodificar a imagem")
-        
-        # 2. Aplicar o enhancement da biblioteca
-        enhanced_img = fingerprint_enhancer.enhance_fingerprint(img)
-        
-        # 3. Converter o resultado para uint8 (0-255)
-        # A biblioteca retorna valores float no range [0,1]
-        processed_img = (enhanced_img * 255).astype(np.uint8)
-        
-        # 4. Converter resultado final para PNG (bytes)
-        success, encoded_img = cv2.imencode(".png", processed_img)
-        if not success:
-            raise ValueError("Erro ao converter imagem processada para PNG")
-            
-        return encoded_img.tobytes()
-        
+        # 2. Aplicar o realce do backend e 3. codificar no formato de armazenamento
+        enhanced = encode_image(enhancer.enhance(img), storage_format)
+        return EnhancementResult(enhanced.data, enhancer.name, enhancer.version)
+
     except Exception as e:
-        # Em caso de erro, retorna a imagem original
+        # Em caso de erro, retorna pelo menos a imagem em escala de cinza,
+        # com o array já decodificado
         print(f"Erro no processamento: {e}")
-        # Tenta retornar pelo menos a imagem em escala de cinza
         try:
-            np_arr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(np_arr, cv2.IMREAD_GRAYSCALE)
-            success, encoded_img = cv2.imencode(".png", img)
-            if success:
-                return encoded_img.tobytes()
-        except:
-            pass
-        
-        # Se tudo falhar, retorna os bytes originais
-        return image_bytes
\ No newline at end of file
+            return EnhancementResult(encode_image(img, storage_format).data, identity.name, identity.version)
+        except ValueError:
+            return EnhancementResult(image.data, identity.name, identity.version)
+
+
+def process(image: Union[ImageHandle, bytes], backend: Optional[str] = None) -> bytes:
+    """Só os bytes de enhance_image (imagem realçada)."""
+    return enhance_image(image, backend).image
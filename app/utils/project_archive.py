@@ -0,0 +1,259 @@
+import io
+import json
+import os
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterator, Optional
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, load_only
+from app.constants.enum import VolunteerStatuses
+from app.models.volunteer import Volunteer
+from app.models.fingerprint import (
+    Fingerprint, stored_image_values, FINGERPRINT_METADATA_COLUMNS, FINGERPRINT_IMAGE_HASH_COLUMNS,
+    FINGERPRINT_LEGACY_IMAGE_COLUMNS,
+)
+from app.schemas.archive import ArchiveManifest, ArchiveImportResult
+from app.utils.job_queue import enqueue_jobs
+from app.utils.project_export import plain
+
+MANIFEST_NAME = "manifest.json"
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+# Gravação das imagens em paralelo: o custo é o fsync de cada arquivo
+IMPORT_STORE_THREADS = int(os.getenv("IMPORT_STORE_THREADS", "8"))
+
+IMAGE_NAMES = ("image_data", "image_filtered", "image_processed")
+MANIFEST_IMAGE_KEYS = {"image_data": "image", "image_filtered": "image_filtered", "image_processed": "image_processed"}
+
+EXPORT_FIELDS = ["pattern_type", "delta", "number_of_lines", "notes"]
+VOLUNTEER_EXPORT_FIELDS = ["name", "age", "description", "gender", "weight", "height", "phone", "status"]
+
+
+class ArchiveReader:
+    """Leitura por nome de membros de um .zip ou .tar (com ou sem compressão)."""
+
+    def __init__(self, fileobj):
+        if zipfile.is_zipfile(fileobj):
+            fileobj.seek(0)
+            self._zip = zipfile.ZipFile(fileobj)
+            self._tar = None
+        else:
+            fileobj.seek(0)
+            try:
+                self._tar = tarfile.open(fileobj=fileobj, mode="r:*")
+            except tarfile.TarError:
+                raise HTTPException(status_code=400, detail="O arquivo deve ser .zip ou .tar")
+            self._zip = None
+
+    def read(self, name: str) -> bytes:
+        try:
+            if self._zip is not None:
+                return self._zip.read(name)
+            member = self._tar.extractfile(name)
+            if member is None:
+                raise KeyError(name)
+            return member.read()
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f"Arquivo {name} não encontrado no pacote")
+
+    def close(self) -> None:
+        (self._zip or self._tar).close()
+
+
+def import_project_archive(db: Session, project_id: int, fileobj,
+                           backend: Optional[str] = None) -> ArchiveImportResult:
+    """
+    Importa voluntários e digitais de um pacote com `manifest.json`.
+
+    As linhas são inseridas com INSERTs em lote (executemany) de
+    IMPORT_BATCH_SIZE digitais; as imagens de cada lote são gravadas no
+    armazenamento em paralelo. Digitais sem `image_filtered` no pacote vão
+    para a fila de realce (enhancement-worker.py) com o `backend` do projeto. Tudo numa transação: se
+    algo falha nada é gravado no banco.
+    """
+    archive = ArchiveReader(fileobj)
+    try:
+        try:
+            manifest = ArchiveManifest.model_validate_json(archive.read(MANIFEST_NAME))
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"manifest.json inválido: {e}")
+
+        keys = [volunteer.key for volunteer in manifest.volunteers]
+        if len(set(keys)) != len(keys):
+            raise HTTPException(status_code=400, detail="Chaves de voluntário repetidas no manifest")
+        unknown = {fp.volunteer for fp in manifest.fingerprints} - set(keys)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Digitais com voluntário fora do manifest: {sorted(unknown)}"
+            )
+
+        now = datetime.utcnow()
+        volunteer_ids = {}
+        if manifest.volunteers:
+            rows = db.execute(
+                insert(Volunteer).returning(Volunteer.id, sort_by_parameter_order=True),
+                [
+                    {
+                        **volunteer.model_dump(exclude={"key", "status"}),
+                        "status": volunteer.status or VolunteerStatuses.pending,
+                        "project_id": project_id,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for volunteer in manifest.volunteers
+                ],
+            )
+            volunteer_ids = dict(zip(keys, rows.scalars()))
+
+        queued = 0
+        with ThreadPoolExecutor(IMPORT_STORE_THREADS) as pool:
+            for start in range(0, len(manifest.fingerprints), IMPORT_BATCH_SIZE):
+                batch = manifest.fingerprints[start:start + IMPORT_BATCH_SIZE]
+
+                # Leitura sequencial do pacote, gravação das imagens em paralelo
+                images = [
+                    (name, archive.read(getattr(fp, MANIFEST_IMAGE_KEYS[name])))
+                    for fp in batch
+                    for name in IMAGE_NAMES
+                    if getattr(fp, MANIFEST_IMAGE_KEYS[name]) is not None
+                ]
+                stored = iter(pool.map(lambda item: stored_image_values(*item), images))
+
+                rows = []
+                for fp in batch:
+                    row = {
+                        "volunteer_id": volunteer_ids[fp.volunteer],
+                        "hand": fp.hand,
+                        "finger": fp.finger,
+                        "pattern_type": fp.pattern_type,
+                        "delta": fp.delta,
+                        "number_of_lines": fp.number_of_lines,
+                        "notes": fp.notes,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for name in IMAGE_NAMES:
+                        if getattr(fp, MANIFEST_IMAGE_KEYS[name]) is not None:
+                            row.update(next(stored))
+                        else:
+                            row.update(stored_image_values(name, None))
+                    rows.append(row)
+
+                ids = db.execute(
+                    insert(Fingerprint).returning(Fingerprint.id, sort_by_parameter_order=True),
+                    rows,
+                ).scalars().all()
+
+                pending = [id for id, fp in zip(ids, batch) if fp.image_filtered is None]
+                enqueue_jobs(db, pending, backend=backend)
+                queued += len(pending)
+
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        archive.close()
+
+    return ArchiveImportResult(
+        volunteers=len(manifest.volunteers),
+        fingerprints=len(manifest.fingerprints),
+        queued=queued,
+    )
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Destino de escrita sem seek: acumula o que zipfile/tarfile escrevem até ser drenado."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def export_project_archive(db: Session, project_id: int, archive_format: str) -> Iterator[bytes]:
+    """
+    Gera o pacote (.zip ou .tar) do projeto no mesmo formato aceito pela
+    importação. Cada imagem é escrita e transmitida antes de ler a próxima;
+    o manifest vai por último, quando todas as digitais já foram vistas.
+    """
+    buffer = _StreamBuffer()
+    if archive_format == "zip":
+        archive = zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED)
+
+        def add(name: str, data: bytes) -> None:
+            info = zipfile.ZipInfo(name, date_time=datetime.utcnow().timetuple()[:6])
+            archive.writestr(info, data)
+    else:
+        archive = tarfile.open(fileobj=buffer, mode="w|")
+
+        def add(name: str, data: bytes) -> None:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(datetime.utcnow().timestamp())
+            archive.addfile(info, io.BytesIO(data))
+
+    volunteers = (
+        db.query(Volunteer)
+        .filter(Volunteer.project_id == project_id)
+        .order_by(Volunteer.id)
+        .all()
+    )
+    manifest = {
+        "version": 1,
+        "volunteers": [
+            {"key": str(volunteer.id), **{name: plain(getattr(volunteer, name)) for name in VOLUNTEER_EXPORT_FIELDS}}
+            for volunteer in volunteers
+        ],
+        "fingerprints": [],
+    }
+
+    fingerprints = (
+        db.query(Fingerprint)
+        .options(load_only(
+            *FINGERPRINT_METADATA_COLUMNS, *FINGERPRINT_IMAGE_HASH_COLUMNS, *FINGERPRINT_LEGACY_IMAGE_COLUMNS,
+            Fingerprint.image_data_format, Fingerprint.image_filtered_format, Fingerprint.image_processed_format,
+        ))
+        .join(Volunteer, Fingerprint.volunteer_id == Volunteer.id)
+        .filter(Volunteer.project_id == project_id)
+        .order_by(Fingerprint.id)
+        .yield_per(100)
+    )
+
+    for fp in fingerprints:
+        entry = {
+            "volunteer": str(fp.volunteer_id),
+            "hand": plain(fp.hand),
+            "finger": plain(fp.finger),
+            **{name: plain(getattr(fp, name)) for name in EXPORT_FIELDS},
+        }
+        for name in IMAGE_NAMES:
+            data = getattr(fp, name)
+            if data is None:
+                continue
+            extension = getattr(fp, f"{name}_format") or "bin"
+            path = f"images/{fp.id}-{name}.{extension}"
+            add(path, data)
+            entry[MANIFEST_IMAGE_KEYS[name]] = path
+            yield buffer.drain()
+        manifest["fingerprints"].append(entry)
+
+    add(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2).encode())
+    archive.close()
+    yield buffer.drain()
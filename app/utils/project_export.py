@@ -0,0 +1,143 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.volunteer import Volunteer
+from app.models.fingerprint import Fingerprint
+from app.models.detection import SingularPointDetection
+
+EXPORT_BATCH_SIZE = 500
+
+VOLUNTEER_FIELDS = [
+    "id", "name", "age", "gender", "weight", "height", "phone",
+    "status", "description", "created_at", "updated_at",
+]
+FINGERPRINT_FIELDS = [
+    "id", "hand", "finger", "pattern_type", "delta", "number_of_lines", "notes",
+    "image_data_hash", "image_filtered_hash", "image_filtered_backend", "image_filtered_backend_version",
+    "image_normalized_hash", "ingest_crop_x", "ingest_crop_y", "ingest_crop_width", "ingest_crop_height",
+    "ingest_scale", "created_at",
+]
+DETECTION_FIELDS = ["image_hash", "params_key", "deltas", "cores", "created_at"]
+
+
+def plain(value):
+    """Converte enums e datas para valores serializáveis em JSON/CSV."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_project_volunteers(db: Session, project_id: int) -> Iterator[dict]:
+    """
+    Percorre os voluntários do projeto com as digitais (só metadados) e os
+    resultados de detecção das imagens atuais de cada digital.
+
+    Uma única consulta ordenada por voluntário, digital e detecção é lida em
+    lotes de EXPORT_BATCH_SIZE linhas (cursor no servidor com psycopg2), e as
+    linhas são agrupadas conforme chegam: só um voluntário fica em memória.
+
+    Yields:
+        dict: voluntário com a lista `fingerprints`, cada uma com `detections`
+    """
+    columns = (
+        [getattr(Volunteer, name).label(f"volunteer_{name}") for name in VOLUNTEER_FIELDS]
+        + [getattr(Fingerprint, name).label(f"fingerprint_{name}") for name in FINGERPRINT_FIELDS]
+        + [getattr(SingularPointDetection, name).label(f"detection_{name}") for name in DETECTION_FIELDS]
+    )
+    stmt = (
+        select(*columns)
+        .select_from(Volunteer)
+        .outerjoin(Fingerprint, Fingerprint.volunteer_id == Volunteer.id)
+        .outerjoin(SingularPointDetection, SingularPointDetection.fingerprint_id == Fingerprint.id)
+        .where(Volunteer.project_id == project_id)
+        .order_by(Volunteer.id, Fingerprint.id, SingularPointDetection.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    volunteer = None
+    fingerprint = None
+    for row in db.execute(stmt):
+        row = row._mapping
+
+        if volunteer is None or volunteer["id"] != row["volunteer_id"]:
+            if volunteer is not None:
+                yield volunteer
+            volunteer = {name: plain(row[f"volunteer_{name}"]) for name in VOLUNTEER_FIELDS}
+            volunteer["fingerprints"] = []
+            fingerprint = None
+
+        if row["fingerprint_id"] is None:
+            continue
+        if fingerprint is None or fingerprint["id"] != row["fingerprint_id"]:
+            fingerprint = {name: plain(row[f"fingerprint_{name}"]) for name in FINGERPRINT_FIELDS}
+            fingerprint["detections"] = []
+            volunteer["fingerprints"].append(fingerprint)
+
+        if row["detection_image_hash"] is None:
+            continue
+        if row["detection_image_hash"] in (fingerprint["image_data_hash"], fingerprint["image_normalized_hash"]):
+            image_type = "raw"
+        elif row["detection_image_hash"] == fingerprint["image_filtered_hash"]:
+            image_type = "filtered"
+        else:
+            # Resultado de uma imagem que a digital não tem mais
+            continue
+        fingerprint["detections"].append({
+            "image_type": image_type,
+            "params": json.loads(row["detection_params_key"]),
+            "deltas": row["detection_deltas"],
+            "cores": row["detection_cores"],
+            "created_at": plain(row["detection_created_at"]),
+        })
+
+    if volunteer is not None:
+        yield volunteer
+
+
+def export_ndjson(db: Session, project_id: int) -> Iterator[str]:
+    """Uma linha JSON por voluntário, com as digitais e detecções aninhadas."""
+    for volunteer in iter_project_volunteers(db, project_id):
+        yield json.dumps(volunteer, ensure_ascii=False) + "\n"
+
+
+def export_csv(db: Session, project_id: int) -> Iterator[str]:
+    """
+    Uma linha por digital com as colunas do voluntário repetidas; voluntários
+    sem digitais saem numa linha com as colunas da digital vazias. As
+    detecções vão como JSON na coluna `detections`.
+    """
+    header = (
+        [f"volunteer_{name}" for name in VOLUNTEER_FIELDS]
+        + [f"fingerprint_{name}" for name in FINGERPRINT_FIELDS]
+        + ["detections"]
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(header)
+    yield flush()
+
+    for volunteer in iter_project_volunteers(db, project_id):
+        volunteer_values = [volunteer[name] for name in VOLUNTEER_FIELDS]
+        if not volunteer["fingerprints"]:
+            writer.writerow(volunteer_values + [None] * (len(FINGERPRINT_FIELDS) + 1))
+        for fingerprint in volunteer["fingerprints"]:
+            writer.writerow(
+                volunteer_values
+                + [fingerprint[name] for name in FINGERPRINT_FIELDS]
+                + [json.dumps(fingerprint["detections"], ensure_ascii=False)]
+            )
+        yield flush()
@@ -0,0 +1,37 @@
+from threading import Lock
+from sqlalchemy import event
+
+
+class StatementCounter:
+    """
+    Registra os comandos SQL enviados pelas engines enquanto está ativo
+    (`with StatementCounter(engine, async_engine.sync_engine) as counter`).
+    Vale para todas as threads, então cobre também as rotas `def`, que o
+    FastAPI executa no threadpool.
+    """
+
+    def __init__(self, *engines):
+        self.engines = engines
+        self.statements = []
+        self._lock = Lock()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.statements.append(statement)
+
+    def __enter__(self) -> "StatementCounter":
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.statements.clear()
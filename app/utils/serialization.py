@@ -0,0 +1,73 @@
+import typing
+from operator import attrgetter
+from typing import Any, Callable, Optional
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+class ORJSONResponse(Response):
+    """Resposta JSON serializada com orjson (enums, datas e numpy sem conversão prévia)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def constant(value) -> Callable[[Any], Any]:
+    return lambda obj: value
+
+
+def _list_item_model(annotation) -> Optional[type[BaseModel]]:
+    """O modelo de `List[Modelo]` (ou `Optional[List[Modelo]]`), se for o caso."""
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    if typing.get_origin(annotation) is list and args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+        return args[0]
+    if len(args) == 1 and typing.get_origin(args[0]) is list:
+        return _list_item_model(args[0])
+    return None
+
+
+def compile_serializer(schema: type[BaseModel], **sources: Callable[[Any], Any]) -> Callable[[Any], dict]:
+    """
+    Monta, uma única vez, a função que converte um objeto do ORM no dict do
+    `schema`, sem construir nem validar o modelo Pydantic a cada linha.
+
+    Os campos são lidos com um único attrgetter; listas de modelos
+    (`List[FingerprintSummary]`) usam o serializador do modelo aninhado.
+    `sources` substitui a leitura de um campo: `campo=lambda obj: ...`.
+
+    Só serve para dados confiáveis (linhas do banco), que já respeitam os
+    tipos do schema: nada é validado.
+    """
+    names = []
+    computed = dict(sources)
+    for name, field in schema.model_fields.items():
+        if name in computed:
+            continue
+        item_model = _list_item_model(field.annotation)
+        if item_model is not None:
+            item_serializer = compile_serializer(item_model)
+            computed[name] = lambda obj, name=name, item_serializer=item_serializer: [
+                item_serializer(item) for item in getattr(obj, name)
+            ]
+        else:
+            names.append(name)
+
+    read = attrgetter(*names) if len(names) > 1 else (lambda obj: (getattr(obj, names[0]),))
+    computed = list(computed.items())
+
+    def serialize(obj) -> dict:
+        values = dict(zip(names, read(obj)))
+        for name, source in computed:
+            values[name] = source(obj)
+        return values
+
+    return serialize
+
+
+def fast_response(content, response: Optional[Response] = None, status_code: int = 200) -> ORJSONResponse:
+    """ORJSONResponse com os cabeçalhos já definidos na resposta da rota (ex.: X-Next-Cursor)."""
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
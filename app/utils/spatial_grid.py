@@ -0,0 +1,48 @@
+import math
+from collections import defaultdict
+
+
+def suppress_nearby_points(points: list[dict], min_distance: float) -> list[dict]:
+    """
+    Mantém os pontos em ordem, descartando os que ficam a menos de
+    `min_distance` de algum ponto já mantido.
+
+    Os pontos mantidos são indexados numa grade espacial com células de lado
+    `min_distance`, então cada ponto só é comparado com as 9 células vizinhas.
+
+    Args:
+        points (list[dict]): Pontos com chaves 'x' e 'y', já em ordem de prioridade
+        min_distance (float): Distância mínima entre pontos mantidos
+
+    Returns:
+        list[dict]: Pontos mantidos, na mesma ordem da entrada
+    """
+    if min_distance <= 0:
+        return list(points)
+
+    grid = defaultdict(list)
+    filtered = []
+
+    for point in points:
+        cell_x = math.floor(point['x'] / min_distance)
+        cell_y = math.floor(point['y'] / min_distance)
+
+        is_duplicate = False
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for existing in grid.get((cell_x + dx, cell_y + dy), ()):
+                    dist = math.sqrt((point['x'] - existing['x'])**2 +
+                                     (point['y'] - existing['y'])**2)
+                    if dist < min_distance:
+                        is_duplicate = True
+                        break
+                if is_duplicate:
+                    break
+            if is_duplicate:
+                break
+
+        if not is_duplicate:
+            filtered.append(point)
+            grid[(cell_x, cell_y)].append(point)
+
+    return filtered
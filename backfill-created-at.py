@@ -0,0 +1,42 @@
+import sys
+from datetime import datetime
+
+from sqlalchemy import func, text
+
+from app.db import engine
+from app.models.user import User
+from app.models.project import Project
+from app.models.fingerprint import Fingerprint
+
+# Tabelas paginadas por (created_at, id) cujo created_at aceitava NULL
+MODELS = (User, Project, Fingerprint)
+
+# Sem created_at nem updated_at a linha vai para o fim das listagens (a mais antiga)
+EPOCH = datetime(1970, 1, 1)
+
+
+def main():
+    """
+    Preenche created_at vazio (com updated_at, ou EPOCH) e, no PostgreSQL,
+    torna a coluna NOT NULL. A paginação por cursor depende de created_at em
+    todas as linhas: com NULL o cursor não pode ser gerado e as linhas somem
+    das páginas seguintes.
+    """
+    with engine.begin() as conn:
+        for model in MODELS:
+            table = model.__table__
+            result = conn.execute(
+                table.update()
+                .where(table.c.created_at.is_(None))
+                .values(created_at=func.coalesce(table.c.updated_at, EPOCH))
+            )
+            print(f"{table.name}: {result.rowcount} linhas preenchidas", file=sys.stderr)
+
+            if conn.dialect.name == "postgresql":
+                conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN created_at SET NOT NULL"))
+
+    print("Concluído", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
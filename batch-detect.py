@@ -0,0 +1,57 @@
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+from app.db import SessionLocal
+from app.constants.enum import ImageTypeEnum
+from app.utils.batch_detection import select_fingerprint_ids, run_batch_detection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detecção de deltas e núcleos em lote")
+    parser.add_argument("--project-id", type=int)
+    parser.add_argument("--volunteer-id", type=int)
+    parser.add_argument("--ids", type=int, nargs="+", help="IDs das digitais")
+    parser.add_argument("--image-type", choices=[t.value for t in ImageTypeEnum], default="filtered")
+    parser.add_argument("--block-size", type=int, default=16)
+    parser.add_argument("--min-coherence", type=float, default=0.5)
+    parser.add_argument("--pyramid", action="store_true")
+    parser.add_argument("--update-delta", action="store_true", help="Grava a quantidade de deltas em Fingerprint.delta")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if args.project_id is None and args.volunteer_id is None and args.ids is None:
+        parser.error("informe --project-id, --volunteer-id ou --ids")
+
+    db = SessionLocal()
+    errors = 0
+    try:
+        fingerprint_ids = select_fingerprint_ids(db, args.project_id, args.volunteer_id, args.ids)
+        print(f"{len(fingerprint_ids)} digitais", file=sys.stderr)
+
+        with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = run_batch_detection(
+                db,
+                fingerprint_ids,
+                executor,
+                image_type=ImageTypeEnum(args.image_type),
+                block_size=args.block_size,
+                min_coherence=args.min_coherence,
+                pyramid=args.pyramid,
+                update_delta=args.update_delta,
+                max_in_flight=2 * args.workers,
+            )
+            for item in results:
+                errors += "error" in item
+                print(json.dumps(item), flush=True)
+    finally:
+        db.close()
+
+    print(f"Concluído ({errors} erros)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Optional
+
+from app.db import SessionLocal
+from app.models.fingerprint import Fingerprint
+from app.utils.process_images import enhance_image
+from app.utils.ingest import ingest_image, apply_ingest
+from app.utils.image_handle import ImageHandle
+from app.utils.detection_cache import invalidate_fingerprint_detections
+from app.utils.field_cache import invalidate_fingerprint_fields
+from app.utils.job_queue import claim_job, complete_job, fail_job, get_latest_job, JOB_KIND_ENHANCE
+
+stopping = False
+
+
+def request_stop(signum, frame):
+    # Termina o job atual antes de sair
+    global stopping
+    stopping = True
+
+
+def lock_current_fingerprint(db, job, source: tuple) -> Optional[Fingerprint]:
+    """
+    Trava a digital do job e confere que o resultado ainda vale: a imagem
+    (`source`: hashes de image_data e image_normalized no início do job) não foi
+    trocada e nenhum job mais novo foi enfileirado para ela.
+
+    Returns:
+        Fingerprint | None: a digital travada, ou None se o resultado deve ser descartado
+    """
+    fingerprint = (
+        db.query(Fingerprint)
+        .filter(Fingerprint.id == job.fingerprint_id)
+        .populate_existing()
+        .with_for_update()
+        .first()
+    )
+    if fingerprint is None:
+        return None
+    if (fingerprint.image_data_hash, fingerprint.image_normalized_hash) != source:
+        return None
+    latest = get_latest_job(db, job.fingerprint_id, job.kind)
+    if latest is not None and latest.id != job.id:
+        return None
+    return fingerprint
+
+
+def run_enhancement(db, job, worker_id: str) -> None:
+    fingerprint = db.query(Fingerprint).filter(Fingerprint.id == job.fingerprint_id).first()
+    if fingerprint is None:
+        # Digital removida depois do upload: nada a fazer
+        complete_job(db, job, worker_id)
+        return
+    if not fingerprint.image_data:
+        raise ValueError("Digital sem image_data")
+
+    source = (fingerprint.image_data_hash, fingerprint.image_normalized_hash)
+    normalized = None
+    if fingerprint.image_normalized_hash is None:
+        # Digital importada ou anterior à normalização: normaliza antes do realce
+        ingested = ingest_image(ImageHandle(fingerprint.image_data, fingerprint.image_data_hash), job.backend)
+        normalized, result = ingested.normalized, ingested.enhanced
+    else:
+        # Só o hash: o array pode estar no cache do processo
+        result = enhance_image(ImageHandle(image_hash=fingerprint.image_normalized_hash), job.backend)
+
+    fingerprint = lock_current_fingerprint(db, job, source)
+    if fingerprint is None:
+        # Imagem trocada (ou digital removida) durante o realce: o job mais novo grava o resultado
+        complete_job(db, job, worker_id)
+        return
+
+    if source[1] is None:
+        apply_ingest(fingerprint, normalized)
+    fingerprint.image_filtered = result.image
+    fingerprint.image_filtered_backend = result.backend
+    fingerprint.image_filtered_backend_version = result.version
+    invalidate_fingerprint_detections(db, fingerprint)
+    invalidate_fingerprint_fields(db, fingerprint)
+    if not complete_job(db, job, worker_id):
+        print(f"Job {job.id} retomado por outro worker: resultado descartado", file=sys.stderr)
+
+
+HANDLERS = {
+    JOB_KIND_ENHANCE: run_enhancement,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker da fila de processamento de imagens")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Espera (s) quando a fila está vazia")
+    parser.add_argument("--once", action="store_true", help="Esvazia a fila e sai")
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    print(f"Worker {args.worker_id} iniciado", file=sys.stderr)
+    db = SessionLocal()
+    try:
+        while not stopping:
+            job = claim_job(db, args.worker_id)
+            if job is None:
+                if args.once:
+                    break
+                time.sleep(args.poll_interval)
+                continue
+
+            print(f"Job {job.id} ({job.kind}) da digital {job.fingerprint_id}, tentativa {job.attempts}", file=sys.stderr)
+            try:
+                HANDLERS[job.kind](db, job, args.worker_id)
+            except Exception as e:
+                db.rollback()
+                traceback.print_exc()
+                fail_job(db, job, args.worker_id, f"{type(e).__name__}: {e}")
+    finally:
+        db.close()
+
+    print(f"Worker {args.worker_id} encerrado", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import sys
+
+from sqlalchemy import or_
+from sqlalchemy.orm import undefer
+
+from app.db import SessionLocal
+from app.models.fingerprint import Fingerprint
+
+IMAGE_NAMES = ("image_data", "image_filtered", "image_processed")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Move as imagens gravadas na tabela fingerprints para o armazenamento de imagens"
+    )
+    parser.add_argument("--batch-size", type=int, default=50, help="Digitais por transação")
+    parser.add_argument("--limit", type=int, help="Para depois de migrar esta quantidade de digitais")
+    args = parser.parse_args()
+
+    legacy_columns = [getattr(Fingerprint, f"{name}_legacy") for name in IMAGE_NAMES]
+    pending = or_(*[column.isnot(None) for column in legacy_columns])
+
+    db = SessionLocal()
+    migrated = 0
+    try:
+        while args.limit is None or migrated < args.limit:
+            batch_size = args.batch_size
+            if args.limit is not None:
+                batch_size = min(batch_size, args.limit - migrated)
+
+            # A API continua lendo da coluna antiga enquanto o lote não é gravado
+            batch = (
+                db.query(Fingerprint)
+                .options(*[undefer(column) for column in legacy_columns])
+                .filter(pending)
+                .order_by(Fingerprint.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+
+            for fingerprint in batch:
+                for name in IMAGE_NAMES:
+                    data = getattr(fingerprint, f"{name}_legacy")
+                    if data is not None:
+                        # Grava no armazenamento e limpa a coluna antiga
+                        setattr(fingerprint, name, data)
+            last_id = batch[-1].id
+            db.commit()
+            db.expunge_all()
+
+            migrated += len(batch)
+            print(f"{migrated} digitais migradas (até o ID {last_id})", file=sys.stderr)
+    finally:
+        db.close()
+
+    print(f"Concluído: {migrated} digitais migradas", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+# Banco e armazenamento descartáveis, definidos antes de importar o app
+workdir = tempfile.mkdtemp(prefix="query-budget-")
+os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/budget.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["IMAGE_STORE_PATH"] = os.path.join(workdir, "images")
+os.environ.setdefault("JWT_SECRET", "query-budget")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+
+import jwt
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.db import engine, async_engine, SessionLocal
+from app.main import app
+from app.models import Base, User, Project, UserProject, Volunteer, Fingerprint
+from app.constants.enum import HandEnum, FingerEnum
+from app.utils.query_counter import StatementCounter
+
+# Máximo de comandos SQL por rota, independente da quantidade de linhas:
+# uma rota acima do limite voltou a carregar relacionamentos item a item
+BUDGETS = [
+    ("GET", "/users/", 3),
+    ("GET", "/users/?limit=5", 3),
+    ("GET", "/users/{user_id}", 3),
+    ("GET", "/users/me", 3),
+    ("GET", "/projects/", 1),
+    ("GET", "/projects/{project_id}", 1),
+    ("GET", "/volunteers/", 2),
+    ("GET", "/volunteers/by-project/{project_id}", 2),
+    ("GET", "/volunteers/{volunteer_id}", 2),
+    ("GET", "/fingerprints/?include_images=false", 1),
+    ("GET", "/fingerprints/?image_urls=true", 1),
+    ("GET", "/fingerprints/?volunteer_id={volunteer_id}", 1),
+    ("GET", "/fingerprints/{fingerprint_id}", 1),
+]
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("L", (8, 8), 128).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def seed(rows: int) -> dict:
+    """`rows` usuários, projetos e voluntários, com duas digitais por voluntário."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        projects = [Project(name=f"projeto {i}") for i in range(rows)]
+        users = [User(name=f"usuário {i}", email=f"user{i}@example.com") for i in range(rows)]
+        db.add_all(projects + users)
+        db.flush()
+        db.add_all(
+            UserProject(user_id=user.id, project_id=project.id)
+            for user in users
+            for project in projects[:2]
+        )
+        volunteers = [Volunteer(name=f"voluntário {i}", project_id=projects[0].id) for i in range(rows)]
+        db.add_all(volunteers)
+        db.flush()
+        image = png_bytes()
+        fingerprints = [
+            Fingerprint(volunteer_id=volunteer.id, hand=HandEnum.left, finger=finger, image_data=image)
+            for volunteer in volunteers
+            for finger in (FingerEnum.thumb, FingerEnum.index)
+        ]
+        db.add_all(fingerprints)
+        db.commit()
+        return {
+            "user_id": users[0].id,
+            "project_id": projects[0].id,
+            "volunteer_id": volunteers[0].id,
+            "fingerprint_id": fingerprints[0].id,
+        }
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Conta os comandos SQL de cada rota e falha quando alguma passa do limite"
+    )
+    parser.add_argument("--rows", type=int, default=20, help="Linhas de cada tabela no banco de teste")
+    parser.add_argument("--verbose", action="store_true", help="Mostra os comandos das rotas acima do limite")
+    args = parser.parse_args()
+
+    ids = seed(args.rows)
+    token = jwt.encode({"user_id": ids["user_id"]}, os.environ["JWT_SECRET"], algorithm=os.environ["JWT_ALGORITHM"])
+    client = TestClient(app, raise_server_exceptions=False, headers={"Authorization": f"Bearer {token}"})
+
+    failures = 0
+    with StatementCounter(engine, async_engine.sync_engine) as counter:
+        for method, path, budget in BUDGETS:
+            url = path.format(**ids)
+            counter.reset()
+            response = client.request(method, url)
+            status = "ok" if counter.count <= budget and response.is_success else "FALHOU"
+            print(f"{status:6} {method} {url}: {counter.count}/{budget} comandos, HTTP {response.status_code}")
+            if status != "ok":
+                failures += 1
+                if args.verbose:
+                    for statement in counter.statements:
+                        print(f"       {' '.join(statement.split())}")
+
+    if failures:
+        print(f"{failures} rota(s) acima do limite ou com erro", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import undefer
+
+from app.db import SessionLocal
+from app.models.detection import SingularPointDetection, OrientationField
+from app.models.fingerprint import Fingerprint, FINGERPRINT_IMAGE_HASH_COLUMNS
+from app.utils.image_format import DEFAULT_STORAGE_FORMATS, compact_image, get_storage_format
+from app.utils.image_hash import sha256_hex
+from app.utils.image_store import get_image_store
+
+IMAGE_NAMES = tuple(DEFAULT_STORAGE_FORMATS)
+
+
+def rekey_cached_results(db, old_hash: str, new_hash: str) -> None:
+    """
+    A imagem regravada tem os mesmos pixels com outro hash: as detecções e os
+    campos gravados para o hash antigo continuam valendo para o novo.
+    """
+    for model in (SingularPointDetection, OrientationField):
+        try:
+            with db.begin_nested():
+                db.query(model).filter(model.image_hash == old_hash).update(
+                    {model.image_hash: new_hash}, synchronize_session=False
+                )
+        except IntegrityError:
+            # Já há resultados para o novo hash; os antigos saem na próxima invalidação
+            pass
+
+
+def is_referenced(db, image_hash: str) -> bool:
+    return db.query(Fingerprint.id).filter(
+        or_(*[column == image_hash for column in FINGERPRINT_IMAGE_HASH_COLUMNS])
+    ).first() is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Regrava as imagens derivadas das digitais no formato de armazenamento "
+            "(IMAGE_<NOME>_FORMAT), sem perdas, e informa os bytes economizados"
+        )
+    )
+    parser.add_argument("--images", nargs="+", choices=IMAGE_NAMES, default=list(IMAGE_NAMES))
+    parser.add_argument("--batch-size", type=int, default=50, help="Digitais por transação")
+    parser.add_argument("--limit", type=int, help="Para depois de percorrer esta quantidade de digitais")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--dry-run", action="store_true", help="Só calcula a economia, sem gravar nada")
+    parser.add_argument("--keep-old", action="store_true", help="Não apaga do armazenamento as versões antigas")
+    args = parser.parse_args()
+
+    formats = {name: get_storage_format(name) for name in args.images}
+    legacy_columns = [
+        getattr(Fingerprint, f"{name}_legacy") for name in args.images if getattr(Fingerprint, name).legacy
+    ]
+    store = get_image_store()
+
+    db = SessionLocal()
+    scanned = recompressed = bytes_before = bytes_after = 0
+    last_id = 0
+    try:
+        with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            while args.limit is None or scanned < args.limit:
+                batch_size = args.batch_size
+                if args.limit is not None:
+                    batch_size = min(batch_size, args.limit - scanned)
+
+                batch = (
+                    db.query(Fingerprint)
+                    .options(*[undefer(column) for column in legacy_columns])
+                    .filter(Fingerprint.id > last_id)
+                    .order_by(Fingerprint.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not batch:
+                    break
+
+                images = [
+                    (fingerprint, name, data)
+                    for fingerprint in batch
+                    for name in args.images
+                    if (data := getattr(fingerprint, name))
+                ]
+                results = executor.map(
+                    compact_image,
+                    [data for _, _, data in images],
+                    [formats[name] for _, name, _ in images],
+                )
+
+                replaced = set()
+                for (fingerprint, name, data), compacted in zip(images, results):
+                    if compacted is None:
+                        continue
+                    recompressed += 1
+                    bytes_before += len(data)
+                    bytes_after += len(compacted)
+                    if args.dry_run:
+                        continue
+
+                    old_hash = getattr(fingerprint, f"{name}_hash") or sha256_hex(data)
+                    setattr(fingerprint, name, compacted)
+                    rekey_cached_results(db, old_hash, getattr(fingerprint, f"{name}_hash"))
+                    replaced.add(old_hash)
+
+                last_id = batch[-1].id
+                db.commit()
+                db.expunge_all()
+
+                if not args.keep_old:
+                    # Endereçado pelo conteúdo: só apaga o que nenhuma digital usa mais
+                    for image_hash in replaced:
+                        if not is_referenced(db, image_hash):
+                            store.delete(image_hash)
+
+                scanned += len(batch)
+                print(
+                    f"{scanned} digitais, {recompressed} imagens regravadas, "
+                    f"{bytes_before - bytes_after} bytes a menos (até o ID {last_id})",
+                    file=sys.stderr,
+                )
+    finally:
+        db.close()
+
+    saved = bytes_before - bytes_after
+    ratio = saved / bytes_before if bytes_before else 0.0
+    action = "seriam regravadas" if args.dry_run else "regravadas"
+    print(
+        f"Concluído: {recompressed} imagens {action}, {bytes_before} → {bytes_after} bytes "
+        f"({saved} bytes, {ratio:.1%} a menos)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ from app.models.user_project import UserProject
 from app.models.user import User
 from app.models.fingerprint import Fingerprint
 from app.models.review import Review
+from app.models.detection import SingularPointDetection, OrientationField
+from app.models.processing_job import ProcessingJob
 
 from dotenv import load_dotenv
 import os